@@ -1,17 +1,88 @@
-from mongoengine import connect
+import os
+from functools import lru_cache
+from mongoengine import connect, disconnect_all
+from mongoengine.connection import get_db, ConnectionFailure
 from pymongo import MongoClient
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+
+# Connection settings, overridable per environment (e.g. a replica set URI)
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/backend_challenge_db")
+MONGO_DB = os.getenv("MONGO_DB", "backend_challenge_db")
+
+# Read preference per group of routes:
+# - "list": GET /items and search scans, fine to serve from secondaries
+# - "item": GET /items/{id}, kept on the primary so reads follow the client's own writes
+READ_PREFERENCE_DEFAULTS = {
+    "list": "secondaryPreferred",
+    "item": "primary",
+}
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+# MongoDB rejects a max staleness below 90 seconds
+MIN_MAX_STALENESS_SECONDS = 90
+
+# PyMongo client opened by connect_to_mongo, closed on shutdown
+_client = None
+
+@lru_cache(maxsize=None)
+def get_read_preference(route_group):
+    """
+    Returns the read preference for a group of routes.
+
+    Configured with MONGO_READ_PREFERENCE_<GROUP> (e.g. MONGO_READ_PREFERENCE_LIST=nearest)
+    and MONGO_MAX_STALENESS_SECONDS, which applies to every non-primary mode.
+
+    :raises ValueError: If the mode or staleness is invalid.
+    """
+    mode = os.getenv(f"MONGO_READ_PREFERENCE_{route_group.upper()}", READ_PREFERENCE_DEFAULTS[route_group])
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Invalid read preference '{mode}' for '{route_group}' routes.")
+    if mode == "primary":
+        return Primary()
+
+    try:
+        max_staleness = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "-1"))
+    except ValueError:
+        raise ValueError("MONGO_MAX_STALENESS_SECONDS must be an integer number of seconds.")
+    if 0 <= max_staleness < MIN_MAX_STALENESS_SECONDS:
+        raise ValueError(f"MONGO_MAX_STALENESS_SECONDS must be at least {MIN_MAX_STALENESS_SECONDS}.")
+    return READ_PREFERENCE_MODES[mode](max_staleness=max_staleness)
+
+def validate_read_preferences():
+    """
+    Resolves the read preference of every route group, so a misconfigured
+    environment fails at startup instead of on every request.
+
+    :raises ValueError: If a mode or the staleness is invalid.
+    """
+    for route_group in READ_PREFERENCE_DEFAULTS:
+        get_read_preference(route_group)
 
 def connect_to_mongo():
-    """Establishes a connection to MongoDB using both PyMongo and MongoEngine."""
+    """
+    Establishes a connection to MongoDB using both PyMongo and MongoEngine.
+    A default connection registered beforehand (e.g. by the tests or a CLI tool) is reused as is.
+    """
+    global _client
+    try:
+        return get_db()
+    except ConnectionFailure:
+        pass
+
     try:
         # PyMongo connection (optional, if needed)
-        client = MongoClient(host="localhost", port=27017)
-        db = client["backend_challenge_db"]
+        _client = MongoClient(MONGO_URI)
+        db = _client[MONGO_DB]
 
         # MongoEngine connection
         connect(
-            db="backend_challenge_db",  # Database name
-            host="mongodb://localhost:27017/backend_challenge_db",  # Connection URI
+            db=MONGO_DB,  # Database name
+            host=MONGO_URI,  # Connection URI
             alias="default"  # Alias for default connection
         )
 
@@ -21,6 +92,14 @@ def connect_to_mongo():
         print(f"Error connecting to MongoDB: {e}")
         return None
 
+def close_mongo():
+    """Closes the PyMongo client and every MongoEngine connection."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+    disconnect_all()
+
 if __name__ == "__main__":
     db = connect_to_mongo()
     if db is not None:
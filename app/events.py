@@ -1,23 +1,222 @@
+import asyncio
+import os
+from asyncio import ensure_future, iscoroutine
 from pyee import AsyncIOEventEmitter
 import logging
 
+# Coalescing window of the batch handlers: a batch is delivered once it is full or
+# when the oldest buffered event has waited this long
+EVENT_BATCH_MAX_SIZE = int(os.getenv("EVENT_BATCH_MAX_SIZE", "500"))
+EVENT_BATCH_MAX_WAIT_SECONDS = float(os.getenv("EVENT_BATCH_MAX_WAIT_SECONDS", "0.05"))
+
+class BatchHandler:
+    """
+    Delivers events to `handler` as lists. Events are buffered until `max_batch_size`
+    are pending or the first one has waited `max_wait_seconds`; at most `max_concurrency`
+    batches are delivered at once, and failed batches are retried with exponential backoff.
+    """
+    def __init__(self, emitter, event, handler, max_batch_size, max_wait_seconds, max_concurrency, max_retries, backoff_seconds):
+        self.emitter = emitter
+        self.event = event
+        self.handler = handler
+        self.name = f"{handler.__module__}.{handler.__qualname__}"
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+        self.buffer = []
+        self._timer = None
+        self._timer_loop = None
+        self._semaphore = None
+        self._semaphore_loop = None
+
+        self.delivered_events = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_events = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def add(self, event):
+        """
+        Buffers `event`, flushing when the batch is full. Called from the event loop by `emit`.
+        """
+        loop = asyncio.get_running_loop()
+        self.buffer.append(event)
+        if len(self.buffer) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None or self._timer_loop is not loop:
+            # A timer left on a loop that has since stopped would never fire
+            self._timer = loop.call_later(self.max_wait_seconds, self.flush)
+            self._timer_loop = loop
+
+    def flush(self):
+        """
+        Schedules delivery of the buffered events.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.buffer:
+            return
+
+        batch, self.buffer = self.buffer, []
+        self.emitter.track(self._deliver(batch))
+
+    def _get_semaphore(self):
+        # A semaphore belongs to one event loop; the app (and each test client) may run several
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _deliver(self, batch):
+        async with self._get_semaphore():
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        await self.handler(batch)
+                    except Exception as exc:
+                        if attempt == self.max_retries:
+                            self.failed_events += len(batch)
+                            logger.error(f"Handler {self.name} dropped {len(batch)} events after {attempt + 1} attempts: {exc}")
+                            return
+                        delay = self.backoff_seconds * 2 ** attempt
+                        self.retries += 1
+                        logger.warning(f"Handler {self.name} failed on {len(batch)} events, retrying in {delay}s: {exc}")
+                        await asyncio.sleep(delay)
+                    else:
+                        self.delivered_events += len(batch)
+                        self.batches += 1
+                        return
+            finally:
+                self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "buffered_events": len(self.buffer),
+            "delivered_events": self.delivered_events,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed_events": self.failed_events,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_concurrency": self.max_concurrency,
+        }
+
+class TrackedAsyncIOEventEmitter(AsyncIOEventEmitter):
+    """
+    AsyncIOEventEmitter that keeps track of the handler coroutines it schedules,
+    so shutdown can wait for them instead of dropping them.
+    """
+    def __init__(self, loop=None):
+        super().__init__(loop)
+        self.pending = set()
+        self.batch_handlers = {}
+
+    def track(self, coro):
+        """
+        Schedules `coro` as a task that shutdown waits for.
+        """
+        task = ensure_future(coro, loop=self._loop) if self._loop else ensure_future(coro)
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return task
+
+    def _emit_run(self, f, args, kwargs):
+        def tracked(*args, **kwargs):
+            result = f(*args, **kwargs)
+            if not iscoroutine(result):
+                return result
+            return self.track(result)
+
+        super()._emit_run(tracked, args, kwargs)
+
+    def on_batch(self, event, max_batch_size=EVENT_BATCH_MAX_SIZE, max_wait_seconds=EVENT_BATCH_MAX_WAIT_SECONDS,
+                 max_concurrency=4, max_retries=3, backoff_seconds=0.5):
+        """
+        Registers a coroutine handler that receives lists of `event` payloads (see `BatchHandler`).
+
+        :raises ValueError: If the same handler is already registered for `event`.
+        """
+        def register(handler):
+            batch_handler = BatchHandler(
+                self, event, handler, max_batch_size, max_wait_seconds, max_concurrency, max_retries, backoff_seconds,
+            )
+            key = (event, batch_handler.name)
+            if key in self.batch_handlers:
+                raise ValueError(f"Batch handler {batch_handler.name} is already registered for '{event}'.")
+            self.batch_handlers[key] = batch_handler
+            self.on(event, batch_handler.add)
+            return handler
+
+        return register
+
+    def flush_batches(self):
+        for batch_handler in self.batch_handlers.values():
+            batch_handler.flush()
+
+    def remove_batch_handler(self, event, handler):
+        batch_handler = self.batch_handlers.pop((event, f"{handler.__module__}.{handler.__qualname__}"))
+        self.remove_listener(event, batch_handler.add)
+
+    def batch_stats(self):
+        """
+        Returns the stats of each batch handler, keyed by (event, qualified handler name).
+        """
+        return {key: batch_handler.stats() for key, batch_handler in self.batch_handlers.items()}
+
+    async def wait_for_pending(self, timeout):
+        """
+        Delivers the buffered batches and waits up to `timeout` seconds for the scheduled handlers to finish.
+
+        :return: The number of handlers still running.
+        """
+        self.flush_batches()
+        if not self.pending:
+            return 0
+        _, still_pending = await asyncio.wait(set(self.pending), timeout=timeout)
+        return len(still_pending)
+
+def render_batch_metrics(emitter):
+    """
+    Renders the batch handler stats of `emitter` in the Prometheus text format.
+    """
+    lines = []
+    for stat, kind in (
+        ("delivered_events", "counter"), ("batches", "counter"), ("retries", "counter"), ("failed_events", "counter"),
+        ("buffered_events", "gauge"), ("in_flight", "gauge"), ("peak_in_flight", "gauge"), ("max_concurrency", "gauge"),
+    ):
+        metric = f"app_event_handler_{stat}" + ("_total" if kind == "counter" else "")
+        lines += [f"# TYPE {metric} {kind}"]
+        lines += [
+            f'{metric}{{event="{event}",handler="{name}"}} {stats[stat]}'
+            for (event, name), stats in sorted(emitter.batch_stats().items())
+        ]
+    return "\n".join(lines) + "\n"
+
 # Initialize the event emitter
-event_emitter = AsyncIOEventEmitter()
+event_emitter = TrackedAsyncIOEventEmitter()
 
 # Logger for event system
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Example Event: Item Created
-@event_emitter.on("item_created")
-async def handle_item_created(item_data):
+@event_emitter.on_batch("item_created")
+async def handle_items_created(items):
     """
-    Handles item creation events.
+    Handles item creation events, a batch at a time.
     """
-    logger.info(f"Item created: {item_data['_id']} - {item_data['name']}")
+    logger.info(f"{len(items)} items created (first {items[0]['_id']}, last {items[-1]['_id']})")
 
     #TODO - If I had more time I would send to external API's or
-    # Some AWS cloud infrastructure for event processing
+    # Some AWS cloud infrastructure for event processing (one call per batch)
 
 def emit_item_created_event(item):
     """
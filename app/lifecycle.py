@@ -0,0 +1,82 @@
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from app.database import connect_to_mongo, close_mongo, validate_read_preferences
+from app.events import event_emitter
+from app.logger import logger
+from app.middleware.shutdown import request_tracker
+from app.routes.admin import backfill_stop
+
+# Total time allowed for draining; keep it below the orchestrator's grace period
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "25"))
+
+def flush_logs():
+    for handler in logging.getLogger().handlers + logger.handlers:
+        handler.flush()
+
+def stop_accepting():
+    """
+    Answers new requests with 503 and lets a running backfill stop after its batch
+    (it can be resumed later). Calling it again has no effect.
+    """
+    request_tracker.start_draining()
+    backfill_stop.set()
+
+async def graceful_shutdown(timeout=SHUTDOWN_TIMEOUT_SECONDS):
+    """
+    Stops accepting requests, drains in-flight requests and pending event
+    handlers within `timeout` seconds, flushes logs and closes the database.
+
+    The deadline counts from when draining started: under `app.server` that is the
+    exit signal, and uvicorn has already spent part of it finishing requests.
+
+    :return: A report with the duration of each phase and what was left unfinished.
+    """
+    report = {"phases": {}}
+
+    def finish_phase(name, started):
+        report["phases"][name] = round(time.monotonic() - started, 3)
+        logger.info(f"Shutdown phase '{name}' took {report['phases'][name]}s.")
+
+    started = time.monotonic()
+    stop_accepting()
+    deadline = (request_tracker.draining_since or started) + timeout
+    finish_phase("stop_accepting", started)
+
+    started = time.monotonic()
+    report["unfinished_requests"] = await request_tracker.wait_until_idle(max(deadline - time.monotonic(), 0))
+    finish_phase("drain_requests", started)
+
+    started = time.monotonic()
+    report["unfinished_events"] = await event_emitter.wait_for_pending(max(deadline - time.monotonic(), 0))
+    finish_phase("drain_events", started)
+
+    if report["unfinished_requests"] or report["unfinished_events"]:
+        logger.warning(
+            f"Shutdown deadline reached with {report['unfinished_requests']} requests "
+            f"and {report['unfinished_events']} event handlers still running."
+        )
+
+    started = time.monotonic()
+    flush_logs()
+    finish_phase("flush_logs", started)
+
+    started = time.monotonic()
+    close_mongo()
+    finish_phase("close_database", started)
+
+    flush_logs()
+    return report
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Validates the configuration and connects to MongoDB on startup, and runs
+    the graceful shutdown sequence on exit.
+    """
+    validate_read_preferences()
+    request_tracker.draining = False
+    connect_to_mongo()
+    yield
+    await graceful_shutdown()
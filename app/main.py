@@ -1,12 +1,21 @@
 from fastapi import FastAPI
 from app.routes.items import router as items_router
-from app.database import connect_to_mongo
+from app.routes.admin import router as admin_router
+from app.routes.metrics import router as metrics_router
+from app.lifecycle import lifespan
+from app.middleware.shutdown import RequestTrackingMiddleware
+from app.middleware.request_trace import RequestTraceMiddleware
+from app.utils.request_trace import enable_command_monitoring
 
-connect_to_mongo()
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+app.add_middleware(RequestTrackingMiddleware)
+app.add_middleware(RequestTraceMiddleware)
+enable_command_monitoring()
 
 app.include_router(items_router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,51 @@
+import time
+from app.logger import logger
+from app.utils import request_trace
+from app.utils.request_trace import RequestTrace, current_trace, command_metrics, slow_requests, SLOW_REQUEST_THRESHOLD_MS
+
+def _route_name(scope):
+    # The router stores the matched endpoint in the scope; its name keeps metric labels bounded
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "unmatched")
+
+class RequestTraceMiddleware:
+    """
+    ASGI middleware tracing each request: Mongo command counts go to `command_metrics`
+    and the request log, and requests over the threshold are kept in `slow_requests`
+    when profiling is enabled.
+    """
+    def __init__(self, app, threshold_ms=SLOW_REQUEST_THRESHOLD_MS):
+        self.app = app
+        self.threshold_ms = threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = current_trace.set(trace)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_trace.reset(token)
+            duration_ms = (time.perf_counter() - trace.started) * 1000
+            route = _route_name(scope)
+            command_metrics.record(route, trace)
+
+            if trace.commands:
+                mongo_ms = sum(command["duration_ms"] for command in trace.commands)
+                logger.info(
+                    f"{trace.method} {trace.path} ({route}) -> {status_code} in {duration_ms:.1f}ms, "
+                    f"{len(trace.commands)} Mongo commands in {mongo_ms:.1f}ms"
+                )
+            if request_trace.PROFILING_ENABLED and duration_ms >= self.threshold_ms:
+                slow_requests.append(trace.to_dict(duration_ms, status_code))
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from fastapi.responses import JSONResponse
+
+class RequestTracker:
+    """
+    Counts in-flight HTTP requests and refuses new ones once draining starts.
+    """
+    def __init__(self):
+        self.in_flight = 0
+        self.draining = False
+        self.draining_since = None
+
+    def start_draining(self):
+        """
+        Starts refusing new requests. Only the first call records when draining started.
+        """
+        if not self.draining:
+            self.draining = True
+            self.draining_since = time.monotonic()
+
+    async def wait_until_idle(self, timeout):
+        """
+        Waits up to `timeout` seconds for in-flight requests to finish.
+
+        :return: The number of requests still running.
+        """
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return self.in_flight
+
+request_tracker = RequestTracker()
+
+class RequestTrackingMiddleware:
+    """
+    ASGI middleware feeding `request_tracker`.
+    Answers 503 while the server is draining so load balancers retry elsewhere.
+    """
+    def __init__(self, app, tracker=request_tracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.tracker.draining:
+            response = JSONResponse(
+                {"detail": "Server is shutting down."},
+                status_code=503,
+                headers={"Connection": "close", "Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.tracker.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.tracker.in_flight -= 1
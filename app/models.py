@@ -1,28 +1,235 @@
-from mongoengine import Document, StringField, ListField, FloatField, DateTimeField, ValidationError
+import os
+from mongoengine import Document, StringField, ListField, FloatField, DateTimeField, DictField, ValidationError, Q, QuerySet
+from mongoengine.errors import InvalidQueryError
+from mongoengine.queryset.visitor import QCombination
 from datetime import datetime, timedelta
 from pytz import UTC
 
+# Opt-in compact storage for Item: short keys, direction stored as an integer
+# code and coordinates packed into a GeoJSON point. The Python attributes and
+# the API shape are the same in both layouts.
+COMPACT_STORAGE = os.getenv("ITEM_COMPACT_STORAGE", "").lower() in ("1", "true", "yes")
+
+COMPACT_FIELD_NAMES = {
+    "name": "n",
+    "postcode": "p",
+    "direction_from_new_york": "d",
+    "title": "t",
+    "users": "u",
+    "start_date": "s",
+    "name_folded": "nf",
+}
+LOCATION_FIELD = "loc"
+DIRECTION_CODES = {"NE": 0, "NW": 1, "SE": 2, "SW": 3}
+DIRECTIONS_BY_CODE = {code: direction for direction, code in DIRECTION_CODES.items()}
+
+def _db_field(name):
+    return COMPACT_FIELD_NAMES[name] if COMPACT_STORAGE else name
+
+def _pack(doc):
+    """
+    Encodes the direction and packs latitude/longitude of a compact-keyed document, in place.
+    """
+    direction_key = COMPACT_FIELD_NAMES["direction_from_new_york"]
+    if isinstance(doc.get(direction_key), str):
+        doc[direction_key] = DIRECTION_CODES[doc[direction_key]]
+    if doc.get("latitude") is not None and doc.get("longitude") is not None:
+        doc[LOCATION_FIELD] = {"type": "Point", "coordinates": [doc.pop("longitude"), doc.pop("latitude")]}
+    return doc
+
+def _unpack(doc):
+    """
+    Reverses `_pack`, in place.
+    """
+    direction_key = COMPACT_FIELD_NAMES["direction_from_new_york"]
+    if isinstance(doc.get(direction_key), int):
+        doc[direction_key] = DIRECTIONS_BY_CODE[doc[direction_key]]
+    location = doc.pop(LOCATION_FIELD, None)
+    if location:
+        doc["longitude"], doc["latitude"] = location["coordinates"]
+    return doc
+
+def compact_document(doc):
+    """
+    Converts a raw item document from the default layout to the compact one.
+    """
+    return _pack({COMPACT_FIELD_NAMES.get(key, key): value for key, value in doc.items()})
+
+def expand_document(doc):
+    """
+    Converts a raw item document from the compact layout to the default one.
+    """
+    long_names = {short: name for name, short in COMPACT_FIELD_NAMES.items()}
+    return {long_names.get(key, key): value for key, value in _unpack(dict(doc)).items()}
+
+def to_storage(doc):
+    """
+    Converts a default-layout document (or partial update) to the configured storage layout.
+    """
+    return compact_document(doc) if COMPACT_STORAGE else doc
+
+def from_storage(doc):
+    """
+    Converts a raw document read from the item collection to the default layout.
+    """
+    return expand_document(doc) if COMPACT_STORAGE else doc
+
+def storage_projection(field_names):
+    """
+    Builds a projection on the stored keys of the given Item fields.
+    """
+    if not COMPACT_STORAGE:
+        return {name: 1 for name in field_names}
+    return {
+        LOCATION_FIELD if name in ("latitude", "longitude") else COMPACT_FIELD_NAMES.get(name, name): 1
+        for name in field_names
+    }
+
+class DirectionField(StringField):
+    """
+    Direction from New York, stored as its integer code in the compact layout.
+    Documents are encoded by `_pack`; query and update values are encoded here,
+    so filters work in both layouts.
+    """
+    def to_python(self, value):
+        if isinstance(value, int):
+            return DIRECTIONS_BY_CODE.get(value, value)
+        return super().to_python(value)
+
+    def prepare_query_value(self, op, value):
+        if COMPACT_STORAGE and value in DIRECTION_CODES:
+            return DIRECTION_CODES[value]
+        return super().prepare_query_value(op, value)
+
+# Query operators allowed on latitude/longitude in the compact layout
+COORDINATE_OPERATORS = {"": None, "ne": "$ne", "lt": "$lt", "lte": "$lte", "gt": "$gt", "gte": "$gte", "in": "$in", "nin": "$nin"}
+
+def _translate_coordinate_filters(query):
+    """
+    Rewrites latitude/longitude filters as raw filters on the packed GeoJSON point.
+
+    :raises InvalidQueryError: For an operator the packed point does not support.
+    """
+    raw = dict(query.pop("__raw__", {}))
+    for key in [key for key in query if key.split("__")[0] in ("latitude", "longitude")]:
+        name, _, op = key.partition("__")
+        if op not in COORDINATE_OPERATORS:
+            raise InvalidQueryError(f"Unsupported operator '{op}' on {name} with compact storage.")
+        value = query.pop(key)
+        path = f"{LOCATION_FIELD}.coordinates.{1 if name == 'latitude' else 0}"
+        if op:
+            raw.setdefault(path, {})[COORDINATE_OPERATORS[op]] = value
+        else:
+            raw[path] = value
+    if raw:
+        query["__raw__"] = raw
+    return query
+
+def _translate_q(node):
+    """
+    Applies `_translate_coordinate_filters` to every leaf of a Q tree.
+    """
+    if isinstance(node, QCombination):
+        return QCombination(node.operation, [_translate_q(child) for child in node.children])
+    if isinstance(node, Q):
+        return Q(**_translate_coordinate_filters(dict(node.query)))
+    return node
+
+# Path of each coordinate inside the packed GeoJSON point
+COORDINATE_PATHS = {"latitude": f"{LOCATION_FIELD}.coordinates.1", "longitude": f"{LOCATION_FIELD}.coordinates.0"}
+
+def _reject_coordinates(fields, hint):
+    if COMPACT_STORAGE and any(field.replace(".", "__").split("__")[-1] in COORDINATE_PATHS for field in fields):
+        raise InvalidQueryError(f"Coordinates are packed with compact storage; {hint}")
+
+class ItemQuerySet(QuerySet):
+    """
+    Translates latitude/longitude filters, sorts and projections when they are packed
+    into a GeoJSON point, and rejects the operations that can't be translated.
+    """
+    def __call__(self, q_obj=None, **query):
+        if COMPACT_STORAGE:
+            q_obj = _translate_q(q_obj)
+            query = _translate_coordinate_filters(query)
+        return super().__call__(q_obj, **query)
+
+    def update(self, *args, **update):
+        _reject_coordinates(update, "change them and save() the item instead.")
+        return super().update(*args, **update)
+
+    def distinct(self, field):
+        _reject_coordinates([field], "use scalar() instead of distinct().")
+        return super().distinct(field)
+
+    def sum(self, field):
+        _reject_coordinates([field], "use scalar() instead of sum().")
+        return super().sum(field)
+
+    def average(self, field):
+        _reject_coordinates([field], "use scalar() instead of average().")
+        return super().average(field)
+
+    def _get_order_by(self, keys):
+        order_by = super()._get_order_by(keys)
+        if not COMPACT_STORAGE:
+            return order_by
+        return [(COORDINATE_PATHS.get(key, key), direction) for key, direction in order_by]
+
+    def _fields_to_dbfields(self, fields):
+        # Used for only(), exclude() and scalar(): both coordinates come with the packed point
+        db_fields = super()._fields_to_dbfields(fields)
+        if not COMPACT_STORAGE:
+            return db_fields
+        return [LOCATION_FIELD if field in COORDINATE_PATHS else field for field in db_fields]
+
 class Item(Document):
-    name = StringField(required=True, max_length=50)
-    postcode = StringField(required=True, regex=r"^\d{5}(-\d{4})?$")
+    name = StringField(required=True, max_length=50, db_field=_db_field("name"))
+    postcode = StringField(required=True, regex=r"^\d{5}(-\d{4})?$", db_field=_db_field("postcode"))
     longitude = FloatField(required=False)
     latitude = FloatField(required=False)
-    direction_from_new_york = StringField(choices=["NE", "NW", "SE", "SW"], required=False)
-    title = StringField(required=False)
-    users = ListField(StringField(max_length=50))
-    start_date = DateTimeField(required=False)
+    direction_from_new_york = DirectionField(choices=["NE", "NW", "SE", "SW"], required=False, db_field=_db_field("direction_from_new_york"))
+    title = StringField(required=False, db_field=_db_field("title"))
+    users = ListField(StringField(max_length=50), db_field=_db_field("users"))
+    start_date = DateTimeField(required=False, db_field=_db_field("start_date"))
+    name_folded = StringField(required=False, db_field=_db_field("name_folded"))  # Case-folded copy of name for prefix search
+
+    meta = {
+        "indexes": [
+            {
+                "fields": ["$name", "$title", "$users"],
+                "default_language": "english",
+                "weights": {_db_field("name"): 10, _db_field("title"): 5, _db_field("users"): 1},
+            },
+            "name_folded",
+        ],
+        "queryset_class": ItemQuerySet,
+    }
+
+    def to_mongo(self, use_db_field=True, fields=None):
+        son = super().to_mongo(use_db_field=use_db_field, fields=fields)
+        if COMPACT_STORAGE and use_db_field:
+            _pack(son)
+        return son
+
+    @classmethod
+    def _from_son(cls, son, *args, **kwargs):
+        if COMPACT_STORAGE:
+            son = _unpack(dict(son))
+        return super()._from_son(son, *args, **kwargs)
+
+    def _get_changed_fields(self):
+        changed_fields = super()._get_changed_fields()
+        if COMPACT_STORAGE and {"latitude", "longitude"} & set(changed_fields):
+            # Both coordinates live in the packed location
+            changed_fields = [f for f in changed_fields if f not in ("latitude", "longitude")] + [LOCATION_FIELD]
+        return changed_fields
 
     def clean(self):
         """
         Validates the longitude, latitude, and start_date fields.
+        Keeps name_folded in sync with name on every write.
         """
-        # Validate latitude range
-        if not (-90 <= self.latitude <= 90):
-            raise ValidationError("Invalid latitude. Must be between -90 and 90.")
-
-        # Validate longitude range
-        if not (-180 <= self.longitude <= 180):
-            raise ValidationError("Invalid longitude. Must be between -180 and 180.")
+        self.clean_restored()
 
         if self.start_date:
             # Ensure current_date is UTC-aware
@@ -35,4 +242,52 @@ class Item(Document):
 
             # Validation: start_date must be at least 1 week from now
             if self.start_date < one_week_later:
-                raise ValidationError("startDate must be at least 1 week from the current date.")
\ No newline at end of file
+                raise ValidationError("startDate must be at least 1 week from the current date.")
+
+    def clean_restored(self):
+        """
+        The checks that also apply to existing items restored from an export:
+        everything but the start date rule, which only holds when an item is created.
+        """
+        self.name_folded = self.name.casefold() if self.name else None
+
+        # Validate latitude range
+        if not (-90 <= self.latitude <= 90):
+            raise ValidationError("Invalid latitude. Must be between -90 and 90.")
+
+        # Validate longitude range
+        if not (-180 <= self.longitude <= 180):
+            raise ValidationError("Invalid longitude. Must be between -180 and 180.")
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+# A reservation older than this is treated as abandoned (its request crashed) and can be reclaimed
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+
+class IdempotencyRecord(Document):
+    """
+    Stored outcome of a `POST /items` request sent with an `Idempotency-Key` header.
+    The key is the primary key, so Mongo's `_id` index rejects concurrent duplicates.
+    A record without a response is a reservation for a request still in progress,
+    leased from `reserved_at` for IDEMPOTENCY_LEASE_SECONDS.
+    """
+    key = StringField(primary_key=True)
+    request_hash = StringField(required=True)
+    response = DictField(default=None)
+    created_at = DateTimeField(default=lambda: datetime.now(UTC))
+    reserved_at = DateTimeField(default=lambda: datetime.now(UTC))
+
+    def lease_expired(self):
+        """
+        Whether this reservation is older than its lease. Records stored before
+        leases existed fall back to `created_at`.
+        """
+        reserved_at = self.reserved_at or self.created_at
+        if reserved_at.tzinfo is None:  # Mongo returns naive UTC datetimes
+            reserved_at = UTC.localize(reserved_at)
+        return reserved_at < datetime.now(UTC) - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+
+    meta = {
+        "indexes": [
+            {"fields": ["created_at"], "expireAfterSeconds": IDEMPOTENCY_TTL_SECONDS},
+        ]
+    }
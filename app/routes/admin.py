@@ -0,0 +1,110 @@
+import threading
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from app.tools.backfill import backfill_directions
+from app.utils import request_trace
+from app.utils.profiling import sample_stacks
+from app.logger import logger
+from app.middleware.auth import authenticate_user
+
+router = APIRouter(prefix="/admin")
+
+# State of the direction backfill job running in this process
+backfill_state = {"status": "idle", "report": None}
+backfill_stop = threading.Event()
+
+MAX_PROFILE_SECONDS = 60
+profile_lock = threading.Lock()
+
+def run_backfill(batch_size, max_writes_per_second, start_after):
+    """
+    Runs the direction backfill and records its outcome in `backfill_state`.
+    """
+    try:
+        report = backfill_directions(
+            batch_size=batch_size,
+            max_writes_per_second=max_writes_per_second,
+            start_after=start_after,
+            stop_event=backfill_stop,
+        )
+        backfill_state.update(status="interrupted" if report["interrupted"] else "finished", report=report)
+    except Exception as e:
+        logger.error(f"Direction backfill failed: {e}")
+        backfill_state.update(status="failed", report={"error": str(e)})
+
+@router.post("/backfill-directions", dependencies=[Depends(authenticate_user)])
+async def start_direction_backfill(
+    background_tasks: BackgroundTasks,
+    batch_size: int = 1000,
+    max_writes_per_second: float | None = None,
+    start_after: str | None = None,
+):
+    """
+    Starts recomputing directions for existing items in the background.
+    Pass the `last_id` of an interrupted run as `start_after` to resume it.
+    """
+    if start_after is not None and not ObjectId.is_valid(start_after):
+        raise HTTPException(status_code=400, detail="Invalid start_after ID format.")
+    if backfill_state["status"] == "running":
+        raise HTTPException(status_code=409, detail="A direction backfill is already running.")
+
+    backfill_stop.clear()
+    backfill_state.update(status="running", report=None)
+    background_tasks.add_task(run_backfill, batch_size, max_writes_per_second, start_after)
+
+    logger.info("Started direction backfill.")
+    return {"message": "Direction backfill started."}
+
+@router.get("/backfill-directions", dependencies=[Depends(authenticate_user)])
+async def get_direction_backfill():
+    """
+    Returns the status and report of the last direction backfill.
+    """
+    return backfill_state
+
+@router.delete("/backfill-directions", dependencies=[Depends(authenticate_user)])
+async def stop_direction_backfill():
+    """
+    Stops the running direction backfill after its current batch.
+    """
+    if backfill_state["status"] != "running":
+        raise HTTPException(status_code=409, detail="No direction backfill is running.")
+
+    backfill_stop.set()
+    return {"message": "Direction backfill is stopping."}
+
+def require_profiling():
+    if not request_trace.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled. Set PROFILING_ENABLED=1 to enable it.")
+
+@router.post("/profile", dependencies=[Depends(authenticate_user), Depends(require_profiling)])
+async def run_profiler(seconds: float = 5):
+    """
+    Samples all threads for `seconds` seconds and returns a collapsed-stack file
+    for flamegraph.pl or speedscope.
+    """
+    if not (0 < seconds <= MAX_PROFILE_SECONDS):
+        raise HTTPException(status_code=400, detail=f"'seconds' must be between 0 and {MAX_PROFILE_SECONDS}.")
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running.")
+
+    try:
+        # Sample from a worker thread so the event loop keeps serving (and is sampled)
+        collapsed = await run_in_threadpool(sample_stacks, seconds)
+    finally:
+        profile_lock.release()
+
+    logger.info(f"Profiled the process for {seconds}s.")
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'})
+
+@router.get("/slow-requests", dependencies=[Depends(authenticate_user), Depends(require_profiling)])
+async def get_slow_requests():
+    """
+    Returns the latest requests over SLOW_REQUEST_THRESHOLD_MS, with their phase timings and Mongo commands.
+    """
+    return {
+        "threshold_ms": request_trace.SLOW_REQUEST_THRESHOLD_MS,
+        "requests": list(request_trace.slow_requests),
+    }
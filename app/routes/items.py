@@ -1,8 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from fastapi.concurrency import run_in_threadpool
 from app.models import Item
 from app.utils.direction import calculate_direction
-from app.utils.postcode import is_valid_us_postcode
 from app.utils.start_date import validate_start_date
+from app.utils.validation import validate_item_payload
+from app.utils.idempotency import (
+    request_fingerprint,
+    idempotency_lock,
+    get_stored_response,
+    reserve_key,
+    store_response,
+    release_key,
+)
+from app.database import get_read_preference
+from app.utils.request_trace import phase
 from app.events import emit_item_created_event
 from app.logger import logger
 from mongoengine import ValidationError, SaveConditionError
@@ -14,57 +25,74 @@ def serialize_item(item):
     Converts MongoEngine item to a serializable dictionary.
     Ensures ObjectId is converted to a string.
     """
-    item_dict = item.to_mongo().to_dict()
-    item_dict["_id"] = str(item_dict["_id"])  # Convert ObjectId to string
+    item_dict = item.to_mongo(use_db_field=False).to_dict()  # Attribute names, whatever the storage layout
+    item_dict["_id"] = str(item_dict.pop("id"))  # Convert ObjectId to string
+    item_dict.pop("name_folded", None)  # Internal search field, not part of the API
     return item_dict
 
+SEARCH_MODES = {"text", "prefix"}
+MAX_SEARCH_PAGE_SIZE = 100
+
 router = APIRouter()
 
+def save_new_item(payload: dict) -> Item:
+    """
+    Validates and saves a new item.
+    """
+    with phase("validate"):
+        fields = validate_item_payload(payload)
+
+    # Calculate direction
+    with phase("direction"):
+        direction = calculate_direction(fields["latitude"], fields["longitude"])
+
+    # Create and save the item
+    with phase("db"):
+        item = Item(direction_from_new_york=direction, **fields)
+        item.save()
+
+    return item
+
+async def create_new_item(payload: dict) -> dict:
+    """
+    Saves a new item off the event loop and announces it.
+    Returns the `POST /items` response body.
+    """
+    item = await run_in_threadpool(save_new_item, payload)
+
+    emit_item_created_event({"_id": str(item.id), "name": item.name}) # Event submitted that starts a logger
+    return {"message": "Item created successfully!", "_id": str(item.id)}
+
 @router.post("/items", dependencies=[Depends(authenticate_user)])
-async def create_item(payload: dict):
+async def create_item(
+    payload: dict,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+):
+    """
+    Create an item.
+    Retries sent with the same `Idempotency-Key` header replay the first response
+    instead of creating a duplicate.
+    """
     try:
-        # Extract required fields
-        name = payload.get("name")
-        postcode = payload.get("postcode")
-        latitude = payload.get("latitude")
-        longitude = payload.get("longitude")
-        users = payload.get("users", [])
-        start_date_str = payload.get("startDate")
-        
-        # Validate required fields
-        if not name or not postcode or latitude is None or longitude is None:
-            raise HTTPException(status_code=400, detail="Missing required fields: name, postcode, latitude, or longitude.")
-        if name not in users:
-            raise HTTPException(status_code=400, detail="'name' must be included in 'users' list.")
-        if not is_valid_us_postcode(postcode):
-            raise HTTPException(status_code=400, detail="Invalid postcode format. Please enter a valid US postcode (XXXXX or XXXXX-XXXX).")
-
-        parsed_date = validate_start_date(start_date_str)
-
-        try:
-            latitude = float(latitude)
-            longitude = float(longitude)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Latitude and longitude must be valid floats.")
-
-        # Calculate direction
-        direction = calculate_direction(latitude, longitude)
-
-        # Create and save the item
-        item = Item(
-            name=name,
-            postcode=postcode,
-            latitude=float(latitude),
-            longitude=float(longitude),
-            direction_from_new_york=direction,
-            title=payload.get("title"),
-            users=users,
-            start_date=parsed_date
-        )
-        item.save()
+        if not idempotency_key:
+            return await create_new_item(payload)
+
+        request_hash = request_fingerprint(payload)
+        async with idempotency_lock(idempotency_key):
+            stored = get_stored_response(idempotency_key, request_hash) or reserve_key(idempotency_key, request_hash)
+            if stored is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return stored
 
-        emit_item_created_event({"_id": str(item.id), "name": item.name}) # Event submitted that starts a logger
-        return {"message": "Item created successfully!", "_id": str(item.id)}
+            try:
+                result = await create_new_item(payload)
+            except Exception:
+                release_key(idempotency_key)
+                raise
+
+            store_response(idempotency_key, request_hash, result)
+            return result
 
     except (ValidationError, SaveConditionError) as e:
         # MongoEngine-specific errors
@@ -82,10 +110,49 @@ async def get_all_items():
     Get all items.
     """
     try:
-        items = Item.objects.all()
+        with phase("db"):
+            items = list(Item.objects.read_preference(get_read_preference("list")))
 
         logger.info(f"Retrieved {len(items)} items.")
-        return [serialize_item(item) for item in items]
+        with phase("serialize"):
+            return [serialize_item(item) for item in items]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/items/search", dependencies=[Depends(authenticate_user)])
+async def search_items(q: str = "", mode: str = "text", page: int = 1, page_size: int = 20):
+    """
+    Search items by name, title and users.
+
+    `text` mode uses the Mongo text index and ranks results by relevance.
+    `prefix` mode matches the start of the item name, case-insensitively,
+    using the indexed `name_folded` field (autocomplete).
+    """
+    try:
+        query = q.strip()
+        if not query:
+            raise HTTPException(status_code=400, detail="Missing search query 'q'.")
+        if mode not in SEARCH_MODES:
+            raise HTTPException(status_code=400, detail="Invalid search mode. Use 'text' or 'prefix'.")
+        if page < 1 or not (1 <= page_size <= MAX_SEARCH_PAGE_SIZE):
+            raise HTTPException(status_code=400, detail=f"'page' must be >= 1 and 'page_size' between 1 and {MAX_SEARCH_PAGE_SIZE}.")
+
+        items = Item.objects.read_preference(get_read_preference("list"))
+        if mode == "text":
+            items = items.search_text(query).order_by("$text_score")
+        else:
+            # Anchored, case-sensitive regex on the folded field so Mongo can use the index
+            items = items(name_folded__startswith=query.casefold()).order_by("name_folded")
+
+        with phase("db"):
+            items = list(items.skip((page - 1) * page_size).limit(page_size))
+        with phase("serialize"):
+            results = [serialize_item(item) for item in items]
+
+        logger.info(f"Search '{query}' ({mode}) returned {len(results)} items.")
+        return {"items": results, "page": page, "page_size": page_size}
+    except HTTPException as http_exc:
+        raise http_exc
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
@@ -98,11 +165,13 @@ async def get_item_by_id(item_id: str):
         if not ObjectId.is_valid(item_id):
             raise HTTPException(status_code=400, detail="Invalid item ID format.")
 
-        item = Item.objects.get(id=item_id)
+        with phase("db"):
+            item = Item.objects.read_preference(get_read_preference("item")).get(id=item_id)
 
         logger.info(f"Retrieved item {item_id}.")
     
-        return serialize_item(item)
+        with phase("serialize"):
+            return serialize_item(item)
     except Item.DoesNotExist:
         raise HTTPException(status_code=404, detail="Item not found")
     except Exception as e:
@@ -119,8 +188,9 @@ async def delete_item(item_id: str):
             raise HTTPException(status_code=400, detail="Invalid item ID format.")
 
         # Attempt to find and delete the item
-        item = Item.objects.get(id=item_id)
-        item.delete()
+        with phase("db"):
+            item = Item.objects.get(id=item_id)
+            item.delete()
 
         logger.info(f"Deleted item: {item_id}.")
 
@@ -142,7 +212,8 @@ async def update_item(item_id: str, payload: dict):
             raise HTTPException(status_code=400, detail="Invalid item ID format.")
 
         # Check if the item exists
-        item = Item.objects.get(id=item_id) 
+        with phase("db"):
+            item = Item.objects.get(id=item_id) 
 
         logger.info(f"Retrieved item {item_id}.")
 
@@ -157,7 +228,8 @@ async def update_item(item_id: str, payload: dict):
         logger.info(f"Updating item {item_id}.")
 
         # Save updated item
-        item.save()
+        with phase("db"):
+            item.save()
 
         logger.info(f"Saved/Updated item {item_id}.")
         return {"message": f"Item with ID {item_id} has been successfully updated."}
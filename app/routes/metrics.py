@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.events import event_emitter, render_batch_metrics
+from app.utils.request_trace import command_metrics
+from app.middleware.auth import authenticate_user
+
+router = APIRouter()
+
+@router.get("/metrics", dependencies=[Depends(authenticate_user)], response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Request and MongoDB command counters per route and event handler stats, in the Prometheus text format.
+    """
+    return command_metrics.render() + render_batch_metrics(event_emitter)
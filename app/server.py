@@ -0,0 +1,34 @@
+"""
+Runs the API with uvicorn, draining it gracefully on SIGTERM/SIGINT.
+
+    python -m app.server --host 0.0.0.0 --port 8000
+"""
+import argparse
+import uvicorn
+from app.lifecycle import SHUTDOWN_TIMEOUT_SECONDS, stop_accepting
+
+class GracefulServer(uvicorn.Server):
+    """
+    Stops accepting requests as soon as the exit signal arrives, while uvicorn still
+    serves, so requests in that window get a 503 they can retry elsewhere. uvicorn then
+    closes its sockets and waits for in-flight requests before the app's shutdown runs.
+    """
+    def handle_exit(self, sig, frame):
+        stop_accepting()
+        super().handle_exit(sig, frame)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    config = uvicorn.Config(
+        "app.main:app", host=args.host, port=args.port,
+        # In-flight requests get the shutdown budget; event handlers get what is left of it
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT_SECONDS,
+    )
+    GracefulServer(config).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Recomputes the derived fields of existing items: `direction_from_new_york`
+and `name_folded` (the case-folded name prefix search matches on).
+
+Scans the collection in `_id` order and only writes documents whose stored
+values differ from the computed ones. Runnable from the CLI
+(`python -m app.tools.items backfill`) or through `POST /admin/backfill-directions`.
+"""
+import json
+import os
+import time
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.logger import logger
+from app.models import Item, from_storage, to_storage, storage_projection
+from app.utils.direction import calculate_directions
+
+def _load_checkpoint(checkpoint):
+    if not checkpoint or not os.path.exists(checkpoint):
+        return None
+    with open(checkpoint) as f:
+        return ObjectId(json.load(f)["last_id"])
+
+def _save_checkpoint(checkpoint, last_id):
+    tmp_path = f"{checkpoint}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"last_id": str(last_id)}, f)
+    os.replace(tmp_path, checkpoint)
+
+def _throttle(written, started, max_writes_per_second, stop_event=None):
+    """
+    Sleeps until the average write rate is back under the limit, or until `stop_event` is set.
+    """
+    if not max_writes_per_second:
+        return
+    ahead_by = written / max_writes_per_second - (time.perf_counter() - started)
+    if ahead_by <= 0:
+        return
+    if stop_event is not None:
+        stop_event.wait(ahead_by)
+    else:
+        time.sleep(ahead_by)
+
+def backfill_directions(batch_size=1000, max_writes_per_second=None, checkpoint=None, start_after=None, stop_event=None):
+    """
+    Recomputes directions and folded names for all items in `_id`-ordered batches.
+
+    :param batch_size: Documents read per batch.
+    :param max_writes_per_second: Optional cap on updated documents per second.
+    :param checkpoint: Optional file storing the last processed `_id`, used to resume.
+    :param start_after: Optional `_id` to resume after when no checkpoint is used.
+    :param stop_event: Optional `threading.Event`; the job stops after the current batch when set,
+        without waiting out the throttle.
+    :return: A report with document counts, the last processed `_id` and throughput.
+    """
+    collection = Item._get_collection()
+    last_id = _load_checkpoint(checkpoint) or (ObjectId(start_after) if start_after else None)
+    if last_id:
+        logger.info(f"Resuming direction backfill after {last_id}.")
+
+    report = {"scanned": 0, "updated": 0, "skipped": 0, "interrupted": False}
+    started = time.perf_counter()
+
+    while True:
+        if stop_event is not None and stop_event.is_set():
+            report["interrupted"] = True
+            break
+
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        projection = storage_projection(["latitude", "longitude", "direction_from_new_york", "name", "name_folded"])
+        batch = [from_storage(doc) for doc in collection.find(query, projection).sort("_id", 1).limit(batch_size)]
+        if not batch:
+            break
+
+        located = [doc for doc in batch if doc.get("latitude") is not None and doc.get("longitude") is not None]
+        directions = calculate_directions((doc["latitude"], doc["longitude"]) for doc in located)
+        directions_by_id = {doc["_id"]: direction for doc, direction in zip(located, directions)}
+
+        operations = []
+        for doc in batch:
+            changes = {}
+            direction = directions_by_id.get(doc["_id"])
+            if direction is not None and doc.get("direction_from_new_york") != direction:
+                changes["direction_from_new_york"] = direction
+            # Documents written before name_folded existed are invisible to prefix search
+            if doc.get("name") and doc.get("name_folded") != doc["name"].casefold():
+                changes["name_folded"] = doc["name"].casefold()
+            if changes:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": to_storage(changes)}))
+
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+
+        last_id = batch[-1]["_id"]
+        report["scanned"] += len(batch)
+        report["updated"] += len(operations)
+        report["skipped"] += len(batch) - len(located)
+        if checkpoint:
+            _save_checkpoint(checkpoint, last_id)
+
+        _throttle(report["updated"], started, max_writes_per_second, stop_event)
+
+    report["last_id"] = str(last_id) if last_id else None
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["docs_per_second"] = round(report["scanned"] / report["seconds"], 1) if report["seconds"] else 0.0
+    logger.info(f"Direction backfill finished: {report}")
+    return report
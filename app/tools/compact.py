@@ -0,0 +1,80 @@
+"""
+Rewrites existing items between the default and the compact storage layout.
+
+Run it with the layout the app will use afterwards, so the indexes are rebuilt for it:
+
+    ITEM_COMPACT_STORAGE=1 python -m app.tools.items compact
+    python -m app.tools.items compact --reverse
+"""
+import time
+
+import bson
+from pymongo import ReplaceOne
+
+from app.logger import logger
+from app.models import Item, COMPACT_STORAGE, COMPACT_FIELD_NAMES, compact_document, expand_document
+
+def _collection_stats(collection):
+    """
+    Returns the data and index sizes of the collection, or None when the server can't report them.
+    """
+    try:
+        stats = collection.database.command({"collStats": collection.name})
+    except Exception:  # Not supported by every backend (e.g. mongomock)
+        return None
+    return {"size": stats["size"], "total_index_size": stats["totalIndexSize"]}
+
+def rewrite_item_storage(compact=True, batch_size=1000):
+    """
+    Rewrites every item still in the other layout, in `_id`-ordered batches of `ReplaceOne`.
+    Documents already rewritten are skipped, so an interrupted run can simply be restarted.
+
+    :param compact: True to convert to the compact layout, False to convert back.
+    :return: A report with the number of rewritten documents and the bytes saved.
+    :raises ValueError: If ITEM_COMPACT_STORAGE does not match the target layout.
+    """
+    if compact != COMPACT_STORAGE:
+        raise ValueError("Set ITEM_COMPACT_STORAGE to match the target layout before rewriting items.")
+
+    collection = Item._get_collection()
+    # Documents still carrying the other layout's name key
+    old_name_key = "name" if compact else COMPACT_FIELD_NAMES["name"]
+    convert = compact_document if compact else expand_document
+
+    stats_before = _collection_stats(collection)
+    report = {"rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+    started = time.perf_counter()
+    last_id = None
+
+    while True:
+        query = {old_name_key: {"$exists": True}}
+        if last_id:
+            query["_id"] = {"$gt": last_id}
+        batch = list(collection.find(query).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            new_doc = convert(doc)
+            report["bytes_before"] += len(bson.encode(doc))
+            report["bytes_after"] += len(bson.encode(new_doc))
+            operations.append(ReplaceOne({"_id": doc["_id"]}, new_doc))
+
+        collection.bulk_write(operations, ordered=False)
+        report["rewritten"] += len(batch)
+        last_id = batch[-1]["_id"]
+
+    # Indexes on the old keys are dead weight, rebuild them for the new layout
+    collection.drop_indexes()
+    Item.ensure_indexes()
+
+    report["bytes_saved"] = report["bytes_before"] - report["bytes_after"]
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    stats_after = _collection_stats(collection)
+    if stats_before and stats_after:
+        report["size_saved"] = stats_before["size"] - stats_after["size"]
+        report["index_size_saved"] = stats_before["total_index_size"] - stats_after["total_index_size"]
+
+    logger.info(f"Item storage rewrite finished: {report}")
+    return report
@@ -0,0 +1,354 @@
+"""
+Bulk import/export tool for the item collection.
+
+    python -m app.tools.items export items.ndjson.gz
+    python -m app.tools.items import items.ndjson.gz --workers 8 --checkpoint import.ckpt
+    python -m app.tools.items backfill --max-writes-per-second 500 --checkpoint backfill.ckpt
+    ITEM_COMPACT_STORAGE=1 python -m app.tools.items compact
+
+Files ending in `.csv` (or `.csv.gz`) use CSV, everything else NDJSON.
+A `.gz` suffix turns on gzip compression.
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from bson import ObjectId
+from fastapi import HTTPException
+from mongoengine import ValidationError, disconnect
+from pymongo.errors import BulkWriteError
+
+from app.database import connect_to_mongo
+from app.logger import logger
+from app.models import Item, from_storage, storage_projection
+from app.tools.backfill import backfill_directions
+from app.tools.compact import rewrite_item_storage
+from app.utils.direction import calculate_directions
+from app.utils.validation import validate_item_payload
+
+EXPORT_FIELDS = [
+    "_id", "name", "postcode", "latitude", "longitude",
+    "direction_from_new_york", "title", "users", "start_date",
+]
+DUPLICATE_KEY_ERROR = 11000
+PROGRESS_INTERVAL_SECONDS = 5
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+def _detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "csv" if path.removesuffix(".gz").endswith(".csv") else "ndjson"
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+# --- Export ---
+
+def _export_row(doc):
+    row = {field: doc[field] for field in EXPORT_FIELDS if doc.get(field) is not None}
+    row["_id"] = str(row["_id"])
+    if "start_date" in row:
+        row["start_date"] = row["start_date"].isoformat()
+    return row
+
+def export_items(path, fmt=None, batch_size=1000):
+    """
+    Streams the item collection to an NDJSON or CSV file.
+    Memory stays bounded by the cursor batch size.
+
+    :return: The number of exported items.
+    """
+    fmt = _detect_format(path, fmt)
+    cursor = Item._get_collection().find({}, storage_projection(EXPORT_FIELDS), batch_size=batch_size)
+
+    count = 0
+    with _open(path, "w") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+        for doc in cursor:
+            row = _export_row(from_storage(doc))
+            if fmt == "csv":
+                row["users"] = json.dumps(row.get("users", []))
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row) + "\n")
+            count += 1
+
+    logger.info(f"Exported {count} items to {path}.")
+    return count
+
+# --- Import ---
+
+def _from_csv_row(row):
+    row = {key: value for key, value in row.items() if value != ""}
+    if "users" in row:
+        row["users"] = json.loads(row["users"])
+    return row
+
+def _read_records(path, fmt=None):
+    """
+    Lazily yields `(line_number, row, error)` for every record of an NDJSON or CSV file.
+    Records that cannot be parsed come with `row=None` and the parse error, so they are
+    rejected like invalid rows and still count towards the checkpoint.
+    """
+    fmt = _detect_format(path, fmt)
+    with _open(path, "r") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                try:
+                    yield reader.line_num, _from_csv_row(row), None
+                except ValueError as e:
+                    yield reader.line_num, None, f"Invalid 'users' JSON: {e}"
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, None, f"Invalid JSON: {e}"
+                    continue
+                if isinstance(row, dict):
+                    yield line_number, row, None
+                else:
+                    yield line_number, None, "Row is not a JSON object."
+
+def read_rows(path, fmt=None):
+    """
+    Lazily yields item payloads from an NDJSON or CSV file, skipping lines that cannot be parsed.
+    """
+    for line_number, row, error in _read_records(path, fmt):
+        if error:
+            logger.warning(f"Skipping line {line_number} of {path}: {error}")
+        else:
+            yield row
+
+def _reject(line_number, reason):
+    logger.warning(f"Rejected row at line {line_number}: {reason}")
+
+def _row_id(source, line_number):
+    """
+    Id of a new row, derived from the absolute path of its file and its line number.
+    """
+    return ObjectId(hashlib.sha256(f"{source}:{line_number}".encode()).digest()[:12])
+
+def _prepare_batch(records, source):
+    """
+    Validates a batch of `(line_number, row, error)` records of the file `source` with
+    the `POST /items` rules and builds the Mongo documents. Directions are computed for
+    the whole batch at once.
+
+    Rows with a valid `_id` are existing items restored from an export: they keep their
+    id, and may have no start date or one that is no longer a week away. Other rows get
+    an id derived from their position in the file, so a resumed import that writes them
+    again skips them as duplicates.
+    Every rejected row is logged with its line number and the reason.
+
+    :return: (documents, number of rejected rows)
+    """
+    valid = []
+    for line_number, row, error in records:
+        if error:
+            _reject(line_number, error)
+            continue
+        payload = dict(row)
+        payload.setdefault("startDate", payload.get("start_date"))  # Accept our own export format
+        restoring = ObjectId.is_valid(row.get("_id"))
+        try:
+            valid.append((line_number, row, restoring, validate_item_payload(payload, restoring=restoring)))
+        except HTTPException as e:
+            _reject(line_number, e.detail)
+        except (TypeError, ValueError) as e:
+            _reject(line_number, str(e))
+
+    directions = calculate_directions((fields["latitude"], fields["longitude"]) for *_, fields in valid)
+
+    docs = []
+    for (line_number, row, restoring, fields), direction in zip(valid, directions):
+        item = Item(direction_from_new_york=direction, **fields)
+        try:
+            if restoring:
+                item.validate(clean=False)
+                item.clean_restored()
+            else:
+                item.validate()
+        except ValidationError as e:
+            _reject(line_number, str(e))
+            continue
+        doc = item.to_mongo()
+        # Keep ids stable so re-imports are idempotent
+        doc["_id"] = ObjectId(row["_id"]) if restoring else _row_id(source, line_number)
+        docs.append(doc)
+
+    return docs, len(records) - len(docs)
+
+def _write_batch(records, source):
+    """
+    Prepares and inserts one batch. Runs inside the worker pool.
+
+    :return: (inserted, rejected, duplicates)
+    """
+    docs, rejected = _prepare_batch(records, source)
+    if not docs:
+        return 0, rejected, 0
+
+    try:
+        result = Item._get_collection().insert_many(docs, ordered=False)
+        return len(result.inserted_ids), rejected, 0
+    except BulkWriteError as e:
+        errors = e.details["writeErrors"]
+        duplicates = sum(1 for error in errors if error["code"] == DUPLICATE_KEY_ERROR)
+        if duplicates != len(errors):
+            raise
+        # Rows already imported by an interrupted run
+        return e.details["nInserted"], rejected, duplicates
+
+def _init_process_worker():
+    # Mongo clients are not fork-safe, every worker process opens its own
+    disconnect()
+    connect_to_mongo()
+
+def _load_checkpoint(checkpoint, path):
+    if not checkpoint or not os.path.exists(checkpoint):
+        return 0
+    with open(checkpoint) as f:
+        state = json.load(f)
+    if state.get("source") != os.path.abspath(path):
+        logger.warning(f"Checkpoint {checkpoint} belongs to {state.get('source')}, ignoring it.")
+        return 0
+    return state["rows"]
+
+def _save_checkpoint(checkpoint, path, rows):
+    tmp_path = f"{checkpoint}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"source": os.path.abspath(path), "rows": rows}, f)
+    os.replace(tmp_path, checkpoint)
+
+def import_items(path, fmt=None, batch_size=1000, workers=4, executor="thread", checkpoint=None):
+    """
+    Imports items from an NDJSON or CSV file.
+
+    Rows are streamed through a generator pipeline and written in batches by a
+    thread or process pool. At most `2 * workers` batches are in flight, so
+    memory stays bounded regardless of file size. The checkpoint records the
+    number of rows fully written, so an interrupted import can be resumed. Later
+    batches may already have been written when a run stops; new rows get ids derived
+    from their line, so the resumed run counts them as duplicates instead of
+    inserting them twice.
+
+    :return: A report with row counts and throughput.
+    """
+    start_row = _load_checkpoint(checkpoint, path)
+    if start_row:
+        logger.info(f"Resuming import of {path} after row {start_row}.")
+
+    source = os.path.abspath(path)
+    rows = itertools.islice(_read_records(path, fmt), start_row, None)
+    report = {"rows": 0, "inserted": 0, "rejected": 0, "duplicates": 0}
+    pending = deque()
+    started = last_progress = time.perf_counter()
+
+    def complete_oldest():
+        nonlocal last_progress
+        future, size = pending.popleft()
+        inserted, rejected, duplicates = future.result()
+        report["rows"] += size
+        report["inserted"] += inserted
+        report["rejected"] += rejected
+        report["duplicates"] += duplicates
+        # Batches complete in submission order, so the checkpoint never skips rows
+        if checkpoint:
+            _save_checkpoint(checkpoint, path, start_row + report["rows"])
+
+        now = time.perf_counter()
+        if now - last_progress >= PROGRESS_INTERVAL_SECONDS:
+            last_progress = now
+            logger.info(f"Imported {report['rows']} rows ({report['rows'] / (now - started):.0f} rows/s).")
+
+    if executor == "process":
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker)
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+    with pool:
+        for batch in _batched(rows, batch_size):
+            if len(pending) >= workers * 2:
+                complete_oldest()
+            pending.append((pool.submit(_write_batch, batch, source), len(batch)))
+        while pending:
+            complete_oldest()
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["rows_per_second"] = round(report["rows"] / report["seconds"], 1) if report["seconds"] else 0.0
+    logger.info(f"Import of {path} finished: {report}")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.tools.items", description="Bulk import/export items.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Stream the item collection to a file.")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=["ndjson", "csv"])
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+
+    import_parser = subparsers.add_parser("import", help="Import items from a file.")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["ndjson", "csv"])
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    import_parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    import_parser.add_argument("--checkpoint", help="File used to resume an interrupted import.")
+
+    backfill_parser = subparsers.add_parser("backfill", help="Recompute direction_from_new_york and name_folded for existing items.")
+    backfill_parser.add_argument("--batch-size", type=int, default=1000)
+    backfill_parser.add_argument("--max-writes-per-second", type=float)
+    backfill_parser.add_argument("--checkpoint", help="File used to resume an interrupted backfill.")
+
+    compact_parser = subparsers.add_parser("compact", help="Rewrite items to the compact storage layout.")
+    compact_parser.add_argument("--batch-size", type=int, default=1000)
+    compact_parser.add_argument("--reverse", action="store_true", help="Rewrite compact items back to the default layout.")
+
+    args = parser.parse_args(argv)
+    connect_to_mongo()
+
+    if args.command == "export":
+        export_items(args.path, fmt=args.format, batch_size=args.batch_size)
+    elif args.command == "backfill":
+        report = backfill_directions(
+            batch_size=args.batch_size,
+            max_writes_per_second=args.max_writes_per_second,
+            checkpoint=args.checkpoint,
+        )
+        print(json.dumps(report))
+    elif args.command == "compact":
+        report = rewrite_item_storage(compact=not args.reverse, batch_size=args.batch_size)
+        print(json.dumps(report))
+    else:
+        report = import_items(
+            args.path,
+            fmt=args.format,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            executor=args.executor,
+            checkpoint=args.checkpoint,
+        )
+        print(json.dumps(report))
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,9 @@
 from geographiclib.geodesic import Geodesic
 
-def calculate_direction(latitude, longitude):
-    ny_lat, ny_lon = 40.7128, -74.0060 
-    geod = Geodesic.WGS84
-
-    results = geod.Inverse(ny_lat, ny_lon, latitude, longitude) 
-
-    azimuth = results['azi1'] 
+NY_LAT, NY_LON = 40.7128, -74.0060
+GEOD = Geodesic.WGS84
 
+def _direction_from_azimuth(azimuth):
     if 0 <= azimuth < 90:
         direction = "NE"
     elif 90 <= azimuth < 180:
@@ -17,4 +13,16 @@ def calculate_direction(latitude, longitude):
     else:
         direction = "NW"
 
-    return direction
\ No newline at end of file
+    return direction
+
+def calculate_direction(latitude, longitude):
+    # Only the azimuth is needed, skip the distance/area terms
+    results = GEOD.Inverse(NY_LAT, NY_LON, latitude, longitude, outmask=Geodesic.AZIMUTH)
+
+    return _direction_from_azimuth(results['azi1'])
+
+def calculate_directions(coordinates):
+    """
+    Calculates the direction from New York for a batch of (latitude, longitude) pairs.
+    """
+    return [calculate_direction(latitude, longitude) for latitude, longitude in coordinates]
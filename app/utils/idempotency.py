@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pytz import UTC
+from fastapi import HTTPException
+from mongoengine import NotUniqueError, Q
+from app.models import IdempotencyRecord, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_LEASE_SECONDS
+
+CACHE_SIZE = 10_000
+
+# In-memory front cache: key -> (expires_at, request_hash, response)
+_cache = OrderedDict()
+# Per-key locks: key -> [lock, number of holders/waiters]
+_locks = {}
+
+def request_fingerprint(payload: dict) -> str:
+    """
+    Hashes the request payload so a reused key with a different body can be detected.
+    """
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+@asynccontextmanager
+async def idempotency_lock(key: str):
+    """
+    Serializes requests sharing the same key within this process.
+    """
+    entry = _locks.setdefault(key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _locks[key]
+
+def _cache_response(key, request_hash, response):
+    _cache[key] = (time.monotonic() + IDEMPOTENCY_TTL_SECONDS, request_hash, response)
+    _cache.move_to_end(key)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+def _check_request_hash(stored_hash, request_hash):
+    if stored_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body.")
+
+def get_stored_response(key: str, request_hash: str):
+    """
+    Returns the stored response for `key`, checking the front cache before Mongo.
+
+    :return: The stored response, or None if the key has not been used or its reservation was abandoned.
+    :raises HTTPException: 422 if the key was used with another body, 409 if its request is still in progress.
+    """
+    cached = _cache.get(key)
+    if cached is not None:
+        expires_at, stored_hash, response = cached
+        if expires_at > time.monotonic():
+            _check_request_hash(stored_hash, request_hash)
+            _cache.move_to_end(key)
+            return response
+        del _cache[key]
+
+    record = IdempotencyRecord.objects(key=key).first()
+    if record is None:
+        return None
+
+    _check_request_hash(record.request_hash, request_hash)
+    if not record.response:
+        if record.lease_expired():
+            return None
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.")
+
+    _cache_response(key, record.request_hash, record.response)
+    return record.response
+
+def reserve_key(key: str, request_hash: str):
+    """
+    Claims `key` before doing the work. Another process claiming it first
+    surfaces as the stored response or a 409; a reservation whose lease expired
+    is taken over.
+
+    :return: The stored response if another request finished first, otherwise None.
+    """
+    try:
+        IdempotencyRecord(key=key, request_hash=request_hash).save(force_insert=True)
+        return None
+    except NotUniqueError:
+        stored = get_stored_response(key, request_hash)
+        if stored is not None:
+            return stored
+
+    # Conditional update, so only one of several retries reclaims the abandoned reservation
+    now = datetime.now(UTC)
+    expired = Q(reserved_at__lt=now - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)) | Q(reserved_at=None)
+    reclaimed = IdempotencyRecord.objects(Q(key=key, response=None) & expired).update_one(set__reserved_at=now)
+    if not reclaimed:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.")
+    return None
+
+def store_response(key: str, request_hash: str, response: dict):
+    """
+    Saves the response of a completed request so retries can replay it.
+    """
+    IdempotencyRecord.objects(key=key).update_one(set__response=response)
+    _cache_response(key, request_hash, response)
+
+def release_key(key: str):
+    """
+    Drops the reservation of a failed request so the client can retry it.
+    """
+    IdempotencyRecord.objects(key=key, response=None).delete()
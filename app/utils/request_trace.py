@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pymongo import monitoring
+
+# Opt-in: slow request capture and the profiling endpoints
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "500"))
+SLOW_REQUEST_BUFFER_SIZE = int(os.getenv("SLOW_REQUEST_BUFFER_SIZE", "100"))
+
+class RequestTrace:
+    """
+    Per-request timings: named phases and the Mongo commands the request issued.
+    """
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.commands = []
+        self._started_commands = {}
+
+    def add_phase(self, name, duration_ms):
+        self.phases[name] = self.phases.get(name, 0.0) + duration_ms
+
+    def command_started(self, event):
+        # Only keep the target collection, never the command body. getMore names it under
+        # "collection"; other commands under their own name, unless it targets no collection
+        # (e.g. the session documents of endSessions)
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(key)
+        self._started_commands[event.request_id] = collection if isinstance(collection, str) else None
+
+    def command_finished(self, event, succeeded):
+        self.commands.append({
+            "command": event.command_name,
+            "collection": self._started_commands.pop(event.request_id, None),
+            "duration_ms": round(event.duration_micros / 1000, 3),
+            "succeeded": succeeded,
+        })
+
+    def to_dict(self, duration_ms, status_code):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status_code": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "phases_ms": {name: round(ms, 3) for name, ms in self.phases.items()},
+            "commands": self.commands,
+        }
+
+current_trace = ContextVar("current_trace", default=None)
+
+# Ring buffer of the latest requests slower than SLOW_REQUEST_THRESHOLD_MS
+slow_requests = deque(maxlen=SLOW_REQUEST_BUFFER_SIZE)
+
+class CommandMetrics:
+    """
+    Process-wide counters of requests and the Mongo commands they issued, per route.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()  # route -> requests
+        self.commands = Counter()  # (route, command) -> commands
+        self.duration_ms = defaultdict(float)  # (route, command) -> total time in Mongo
+
+    def record(self, route, trace):
+        with self._lock:
+            self.requests[route] += 1
+            for command in trace.commands:
+                key = (route, command["command"])
+                self.commands[key] += 1
+                self.duration_ms[key] += command["duration_ms"]
+
+    def command_counts(self, route):
+        """
+        Returns the number of commands per command name issued by `route` so far.
+        """
+        with self._lock:
+            return {command: count for (name, command), count in self.commands.items() if name == route}
+
+    def render(self):
+        """
+        Renders the counters in the Prometheus text format.
+        """
+        with self._lock:
+            lines = [
+                "# HELP app_requests_total Requests handled per route.",
+                "# TYPE app_requests_total counter",
+            ]
+            lines += [f'app_requests_total{{route="{route}"}} {count}' for route, count in sorted(self.requests.items())]
+            lines += [
+                "# HELP app_mongo_commands_total MongoDB commands issued per route and command.",
+                "# TYPE app_mongo_commands_total counter",
+            ]
+            lines += [
+                f'app_mongo_commands_total{{route="{route}",command="{command}"}} {count}'
+                for (route, command), count in sorted(self.commands.items())
+            ]
+            lines += [
+                "# HELP app_mongo_command_seconds_total Time spent in MongoDB commands per route and command.",
+                "# TYPE app_mongo_command_seconds_total counter",
+            ]
+            lines += [
+                f'app_mongo_command_seconds_total{{route="{route}",command="{command}"}} {ms / 1000:.6f}'
+                for (route, command), ms in sorted(self.duration_ms.items())
+            ]
+        return "\n".join(lines) + "\n"
+
+command_metrics = CommandMetrics()
+
+@contextmanager
+def phase(name):
+    """
+    Times a block of request handling under `name`. No-op outside a traced request.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_phase(name, (time.perf_counter() - started) * 1000)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Attaches every Mongo command to the trace of the request that issued it.
+    """
+    def started(self, event):
+        trace = current_trace.get()
+        if trace is not None:
+            trace.command_started(event)
+
+    def succeeded(self, event):
+        trace = current_trace.get()
+        if trace is not None:
+            trace.command_finished(event, succeeded=True)
+
+    def failed(self, event):
+        trace = current_trace.get()
+        if trace is not None:
+            trace.command_finished(event, succeeded=False)
+
+def enable_command_monitoring():
+    """
+    Registers the command listener for every Mongo client created afterwards.
+    """
+    monitoring.register(MongoCommandListener())
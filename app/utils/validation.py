@@ -0,0 +1,52 @@
+from fastapi import HTTPException
+from app.utils.postcode import is_valid_us_postcode
+from app.utils.start_date import validate_start_date
+
+def validate_item_payload(payload: dict, restoring: bool = False) -> dict:
+    """
+    Validates an item creation payload and returns the cleaned Item fields.
+    Shared by `POST /items` and the bulk import tool so both apply the same rules.
+
+    :param payload: The raw item payload (API request body or imported row).
+    :param restoring: The payload is an existing item (e.g. from an export), whose startDate is optional.
+    :return: A dict of Item field values, without the computed direction.
+    :raises HTTPException: If a field is missing or invalid.
+    """
+    # Extract required fields
+    name = payload.get("name")
+    postcode = payload.get("postcode")
+    latitude = payload.get("latitude")
+    longitude = payload.get("longitude")
+    users = payload.get("users", [])
+    start_date_str = payload.get("startDate")
+
+    # Validate required fields
+    if not name or not postcode or latitude is None or longitude is None:
+        raise HTTPException(status_code=400, detail="Missing required fields: name, postcode, latitude, or longitude.")
+    if name not in users:
+        raise HTTPException(status_code=400, detail="'name' must be included in 'users' list.")
+    if not is_valid_us_postcode(postcode):
+        raise HTTPException(status_code=400, detail="Invalid postcode format. Please enter a valid US postcode (XXXXX or XXXXX-XXXX).")
+
+    if start_date_str is None and restoring:
+        parsed_date = None
+    elif not isinstance(start_date_str, str):
+        raise HTTPException(status_code=400, detail="Invalid 'startDate'. Provide a valid ISO 8601 string.")
+    else:
+        parsed_date = validate_start_date(start_date_str)
+
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Latitude and longitude must be valid floats.")
+
+    return {
+        "name": name,
+        "postcode": postcode,
+        "latitude": latitude,
+        "longitude": longitude,
+        "title": payload.get("title"),
+        "users": users,
+        "start_date": parsed_date,
+    }
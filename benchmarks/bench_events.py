@@ -0,0 +1,59 @@
+"""
+Benchmarks event handler throughput.
+
+Emits N events (100,000 by default) at a handler that simulates a downstream call
+of fixed latency, once with a per-event handler and once with a batch handler,
+and reports events/sec and the number of downstream calls.
+
+    python -m benchmarks.bench_events --events 100000 --latency-ms 5
+"""
+import argparse
+import asyncio
+import time
+
+from app.events import TrackedAsyncIOEventEmitter
+
+def downstream(latency, calls):
+    async def call(payload):
+        calls.append(1)
+        await asyncio.sleep(latency)
+    return call
+
+async def run(emitter, events, timeout):
+    start = time.perf_counter()
+    for i in range(events):
+        emitter.emit("bench_event", {"_id": i, "name": f"Item{i}"})
+    unfinished = await emitter.wait_for_pending(timeout)
+    return time.perf_counter() - start, unfinished
+
+def report(label, events, calls, elapsed, unfinished):
+    print(f"{label:<10} {events / elapsed:>10,.0f} events/sec  {len(calls):>7} downstream calls  "
+          f"{elapsed:.2f}s" + (f"  ({unfinished} handlers unfinished)" if unfinished else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event handler throughput.")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--latency-ms", type=float, default=5, help="Simulated downstream call latency.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-wait-ms", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    # One task per event; the downstream would see one call per event
+    calls = []
+    emitter = TrackedAsyncIOEventEmitter()
+    emitter.on("bench_event", downstream(latency, calls))
+    report("per-event", args.events, calls, *asyncio.run(run(emitter, args.events, args.timeout)))
+
+    calls = []
+    emitter = TrackedAsyncIOEventEmitter()
+    emitter.on_batch(
+        "bench_event", max_batch_size=args.batch_size, max_wait_seconds=args.max_wait_ms / 1000,
+        max_concurrency=args.concurrency,
+    )(downstream(latency, calls))
+    report("batched", args.events, calls, *asyncio.run(run(emitter, args.events, args.timeout)))
+
+if __name__ == "__main__":
+    main()
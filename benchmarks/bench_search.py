@@ -0,0 +1,83 @@
+"""
+Benchmarks search latency against a real MongoDB.
+
+Seeds the benchmark database with N items (1,000,000 by default), builds the
+Item indexes and times the same queries GET /items/search runs.
+
+    python -m benchmarks.bench_search --items 1000000 --queries 200
+"""
+import argparse
+import random
+import string
+import time
+from statistics import quantiles
+
+from mongoengine import connect, disconnect
+from app.models import Item, to_storage
+
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+
+def random_name():
+    return random.choice(WORDS).capitalize() + "".join(random.choices(string.ascii_lowercase, k=6))
+
+def seed(count, batch_size=10_000):
+    """
+    Inserts `count` raw item documents in batches, bypassing the ODM for speed.
+    Documents use the storage layout the indexes were built for (ITEM_COMPACT_STORAGE).
+    """
+    collection = Item._get_collection()
+    collection.drop()
+    Item.ensure_indexes()
+
+    for start in range(0, count, batch_size):
+        batch = []
+        for _ in range(min(batch_size, count - start)):
+            name = random_name()
+            batch.append(to_storage({
+                "name": name,
+                "name_folded": name.casefold(),
+                "postcode": "10001",
+                "latitude": random.uniform(-90, 90),
+                "longitude": random.uniform(-180, 180),
+                "title": f"{random.choice(WORDS)} {random.choice(WORDS)}",
+                "users": [name],
+            }))
+        collection.insert_many(batch, ordered=False)
+
+def time_queries(build_query, terms, page_size=20):
+    latencies = []
+    for term in terms:
+        start = time.perf_counter()
+        list(build_query(term).limit(page_size))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def report(label, latencies):
+    p50, p95, p99 = (quantiles(latencies, n=100)[i] for i in (49, 94, 98))
+    print(f"{label:<8} p50={p50:.2f}ms p95={p95:.2f}ms p99={p99:.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark item search latency.")
+    parser.add_argument("--host", default="mongodb://localhost:27017/backend_challenge_bench")
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the existing benchmark data.")
+    args = parser.parse_args()
+
+    connect(host=args.host, alias="default")
+    try:
+        if not args.skip_seed:
+            start = time.perf_counter()
+            seed(args.items)
+            print(f"Seeded {args.items} items in {time.perf_counter() - start:.1f}s")
+
+        text_terms = [random.choice(WORDS) for _ in range(args.queries)]
+        prefix_terms = [random.choice(WORDS)[:3] for _ in range(args.queries)]
+
+        report("text", time_queries(lambda q: Item.objects.search_text(q).order_by("$text_score"), text_terms))
+        report("prefix", time_queries(lambda q: Item.objects(name_folded__startswith=q).order_by("name_folded"), prefix_terms))
+    finally:
+        disconnect()
+
+if __name__ == "__main__":
+    main()
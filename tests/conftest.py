@@ -0,0 +1,54 @@
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.middleware.shutdown import request_tracker
+from app.utils import idempotency, request_trace
+from mongoengine import disconnect
+from tests.utils.database import connect_test_db, reset_test_db
+
+@pytest.fixture(scope="session")
+def test_app():
+    """
+    Connects the test database and starts the app once for the whole session.
+    The app's startup reuses the registered connection, so nothing touches the network.
+    """
+    disconnect()
+    connect_test_db()
+
+    with TestClient(app) as client:
+        yield client
+
+    disconnect()
+
+@pytest.fixture(scope="function", autouse=True)
+def test_db(test_app):
+    """
+    Gives each test an empty database and resets the app's in-memory state.
+    """
+    reset_test_db()
+    request_tracker.draining = False
+    idempotency._cache.clear()
+    request_trace.slow_requests.clear()
+
+    yield
+
+@pytest.fixture(scope="function")
+def test_client(test_app):
+    """
+    The session's test client, authenticated.
+    """
+    test_app.headers.update({"Authorization": "Bearer test_token"})
+    return test_app
+
+def pytest_sessionstart(session):
+    session.config.suite_started = time.perf_counter()
+
+def pytest_terminal_summary(terminalreporter, config):
+    # Under pytest-xdist this runs on the controller, so it covers all workers
+    if os.getenv("PYTEST_XDIST_WORKER"):
+        return
+    workers = getattr(config.option, "numprocesses", None) or 1
+    elapsed = time.perf_counter() - config.suite_started
+    terminalreporter.write_line(f"Suite wall time: {elapsed:.2f}s on {workers} worker(s)")
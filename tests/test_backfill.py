@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from app.models import Item
+from app.routes.admin import backfill_state
+from app.tools.backfill import backfill_directions
+from unittest.mock import patch
+
+def insert_raw(**fields):
+    """
+    Inserts a document directly, like data written before a logic change or imported without a direction.
+    """
+    return Item._get_collection().insert_one({"name": "Raw", "postcode": "10001", "name_folded": "raw", **fields}).inserted_id
+
+def test_backfill_updates_only_changed_documents():
+    correct = insert_raw(latitude=12.3456, longitude=-78.9012, direction_from_new_york="NW")
+    wrong = insert_raw(latitude=12.3456, longitude=-78.9012, direction_from_new_york="NE")
+    missing = insert_raw(latitude=50.0, longitude=0.0)
+    insert_raw()  # No coordinates
+
+    report = backfill_directions(batch_size=2)
+
+    assert report["scanned"] == 4
+    assert report["updated"] == 2
+    assert report["skipped"] == 1
+    assert Item.objects.get(id=correct).direction_from_new_york == "NW"
+    assert Item.objects.get(id=wrong).direction_from_new_york == "NW"
+    assert Item.objects.get(id=missing).direction_from_new_york == "NE"
+
+def test_backfill_sets_missing_folded_names(test_client):
+    collection = Item._get_collection()
+    # Written before name_folded existed, or with a stale value
+    missing = collection.insert_one({"name": "Alice", "postcode": "10001"}).inserted_id
+    stale = collection.insert_one({"name": "Alicia", "postcode": "10001", "name_folded": "old"}).inserted_id
+    insert_raw()
+
+    assert test_client.get("/items/search", params={"q": "ali", "mode": "prefix"}).json()["items"] == []
+
+    report = backfill_directions(batch_size=2)
+
+    assert report["updated"] == 2
+    assert collection.find_one({"_id": missing})["name_folded"] == "alice"
+    assert collection.find_one({"_id": stale})["name_folded"] == "alicia"
+    found = test_client.get("/items/search", params={"q": "ali", "mode": "prefix"}).json()["items"]
+    assert {item["name"] for item in found} == {"Alice", "Alicia"}
+
+def test_backfill_resumes_from_checkpoint(tmp_path):
+    first = insert_raw(latitude=50.0, longitude=0.0)
+    second = insert_raw(latitude=50.0, longitude=0.0)
+    checkpoint = tmp_path / "backfill.ckpt"
+    checkpoint.write_text(json.dumps({"last_id": str(first)}))
+
+    report = backfill_directions(checkpoint=str(checkpoint))
+
+    assert report["scanned"] == 1
+    assert "direction_from_new_york" not in Item._get_collection().find_one({"_id": first})
+    assert Item.objects.get(id=second).direction_from_new_york == "NE"
+    assert json.loads(checkpoint.read_text())["last_id"] == str(second)
+
+def test_backfill_stops_when_interrupted():
+    insert_raw(latitude=50.0, longitude=0.0)
+    stop_event = threading.Event()
+    stop_event.set()
+
+    report = backfill_directions(stop_event=stop_event)
+
+    assert report["interrupted"] is True
+    assert report["scanned"] == 0
+
+def test_backfill_is_throttled():
+    for _ in range(4):
+        insert_raw(latitude=50.0, longitude=0.0)
+
+    with patch("app.tools.backfill.time.sleep") as sleep:
+        backfill_directions(batch_size=2, max_writes_per_second=1)
+
+    assert sleep.call_count == 2
+
+def test_throttled_backfill_stops_promptly():
+    for _ in range(2):
+        insert_raw(latitude=50.0, longitude=0.0)
+    stop_event = threading.Event()
+    reports = []
+    # One write at 0.01 writes per second throttles the run for 100s
+    worker = threading.Thread(target=lambda: reports.append(
+        backfill_directions(batch_size=1, max_writes_per_second=0.01, stop_event=stop_event)
+    ))
+
+    worker.start()
+    time.sleep(0.1)
+    stopped = time.perf_counter()
+    stop_event.set()
+    worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    assert time.perf_counter() - stopped < 1
+    assert reports[0]["interrupted"] is True
+    assert reports[0]["scanned"] == 1
+
+def test_admin_backfill_endpoint(test_client):
+    item_id = insert_raw(latitude=50.0, longitude=0.0)
+
+    response = test_client.post("/admin/backfill-directions", params={"batch_size": 10})
+    assert response.status_code == 200
+
+    # Background tasks run before the test client returns
+    status = test_client.get("/admin/backfill-directions").json()
+    assert status["status"] == "finished"
+    assert status["report"]["updated"] == 1
+    assert Item.objects.get(id=item_id).direction_from_new_york == "NE"
+
+def test_admin_backfill_stop_when_idle(test_client):
+    backfill_state.update(status="idle", report=None)
+
+    response = test_client.delete("/admin/backfill-directions")
+    assert response.status_code == 409
+
+def test_admin_backfill_invalid_start_after(test_client):
+    response = test_client.post("/admin/backfill-directions", params={"start_after": "invalid_id"})
+
+    assert response.status_code == 400
+    assert backfill_state["status"] != "running"
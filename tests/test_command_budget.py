@@ -0,0 +1,124 @@
+import os
+import pytest
+from mongoengine import disconnect
+from mongoengine.connection import get_db
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from app.models import Item, IdempotencyRecord
+from app.utils.request_trace import RequestTrace, current_trace
+from tests.utils.command_budget import command_budget, mongomock_command_events
+from tests.utils.database import connect_test_db, reset_test_db
+from tests.utils.utils import getFutureDate
+
+COMMAND_BUDGET_URI = os.getenv("MONGO_COMMAND_BUDGET_URI")
+
+@pytest.fixture(scope="function", autouse=True)
+def command_events(test_db):
+    """
+    Makes mongomock publish command events like a real server, or switches to the worker's
+    database on a real MongoDB when MONGO_COMMAND_BUDGET_URI is set, where the app's command
+    listener sees the server's actual commands. Indexes are created up front so they don't
+    count against the first request.
+    """
+    if COMMAND_BUDGET_URI:
+        disconnect()
+        connect_test_db(host=COMMAND_BUDGET_URI)
+        reset_test_db()
+
+    Item._get_collection()
+    IdempotencyRecord._get_collection()
+
+    if COMMAND_BUDGET_URI:
+        yield
+        disconnect()
+    else:
+        with mongomock_command_events():
+            yield
+
+@pytest.fixture(scope="function")
+def item_id():
+    # No start date, so the item can be updated (mongomock returns naive datetimes)
+    return str(Item(name="Item1", postcode="12345", latitude=12.3456, longitude=-78.9012, users=["Item1"]).save().id)
+
+ITEM_DATA = {
+    "name": "Item1",
+    "postcode": "12345",
+    "latitude": 12.3456,
+    "longitude": -78.9012,
+    "users": ["Item1"],
+}
+
+def test_create_item_budget(test_client):
+    with command_budget("create_item", insert=1):
+        test_client.post("/items", json={**ITEM_DATA, "startDate": getFutureDate()})
+
+def test_create_item_with_idempotency_key_budget(test_client):
+    data = {**ITEM_DATA, "startDate": getFutureDate()}
+    headers = {"Idempotency-Key": "budget-key"}
+
+    # Lookup, reservation, item insert and stored response
+    with command_budget("create_item", find=1, insert=2, update=1):
+        test_client.post("/items", json=data, headers=headers)
+
+    # Replays come from the in-memory cache
+    with command_budget("create_item"):
+        test_client.post("/items", json=data, headers=headers)
+
+def test_get_all_items_budget(test_client, item_id):
+    with command_budget("get_all_items", find=1):
+        test_client.get("/items")
+
+def test_search_items_budget(test_client, item_id):
+    with command_budget("search_items", find=1):
+        test_client.get("/items/search", params={"q": "item", "mode": "prefix"})
+
+def test_get_item_by_id_budget(test_client, item_id):
+    with command_budget("get_item_by_id", find=1):
+        test_client.get(f"/items/{item_id}")
+
+def test_update_item_budget(test_client, item_id):
+    with command_budget("update_item", find=1, update=1):
+        response = test_client.put(f"/items/{item_id}", json={"title": "New title"})
+    assert response.status_code == 200
+
+def test_delete_item_budget(test_client, item_id):
+    with command_budget("delete_item", find=1, delete=1):
+        test_client.delete(f"/items/{item_id}")
+
+def test_budget_violation_is_reported(test_client, item_id):
+    with pytest.raises(AssertionError, match="get_item_by_id issued"):
+        with command_budget("get_item_by_id", find=1):
+            test_client.get(f"/items/{item_id}")
+            test_client.get(f"/items/{item_id}")
+
+def test_metrics_endpoint(test_client, item_id):
+    test_client.get(f"/items/{item_id}")
+
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'app_mongo_commands_total{route="get_item_by_id",command="find"}' in response.text
+    assert 'app_mongo_command_seconds_total{route="get_item_by_id",command="find"}' in response.text
+
+def test_request_log_includes_command_count(test_client, item_id, caplog):
+    with caplog.at_level("INFO"):
+        test_client.get(f"/items/{item_id}")
+
+    assert any("(get_item_by_id) -> 200" in message and "1 Mongo commands" in message for message in caplog.messages)
+
+def test_bulk_writes_and_cursor_batches():
+    collection = get_db()["command_budget_batches"]
+    trace = RequestTrace("GET", "/")
+    token = current_trace.set(trace)
+    try:
+        collection.bulk_write(
+            [InsertOne({"n": i}) for i in range(150)] + [UpdateOne({}, {"$set": {"x": 1}}), DeleteOne({})],
+        )
+        list(collection.find({}))
+        list(collection.find({}, batch_size=50))
+    finally:
+        current_trace.reset(token)
+
+    # 149 documents: one getMore after the default first batch of 101, two after batches of 50
+    assert [command["command"] for command in trace.commands] == [
+        "insert", "update", "delete", "find", "getMore", "find", "getMore", "getMore",
+    ]
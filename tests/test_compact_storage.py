@@ -0,0 +1,194 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import bson
+import pytest
+from bson import ObjectId
+from app.models import Item, compact_document, expand_document
+from app.tools.compact import rewrite_item_storage
+
+PUBLIC_KEYS = ["_id", "name", "postcode", "longitude", "latitude", "direction_from_new_york", "title", "users", "start_date"]
+
+def long_document():
+    return {
+        "_id": ObjectId(),
+        "name": "Alice",
+        "postcode": "10001",
+        "longitude": -74.006,
+        "latitude": 40.7128,
+        "direction_from_new_york": "SW",
+        "title": "Boss",
+        "users": ["Alice"],
+        "name_folded": "alice",
+    }
+
+def test_compact_document_round_trip():
+    doc = long_document()
+    compact = compact_document(doc)
+
+    assert compact["d"] == 3
+    assert compact["loc"] == {"type": "Point", "coordinates": [-74.006, 40.7128]}
+    assert "latitude" not in compact
+    assert len(bson.encode(compact)) < len(bson.encode(doc))
+    assert expand_document(compact) == doc
+
+def test_rewrite_requires_matching_layout():
+    with pytest.raises(ValueError):
+        rewrite_item_storage(compact=True)
+
+def test_rewrite_back_to_default_layout():
+    doc = long_document()
+    Item._get_collection().insert_one(compact_document(doc))
+
+    report = rewrite_item_storage(compact=False)
+
+    assert report["rewritten"] == 1
+    assert report["bytes_saved"] < 0
+    item = Item.objects.get(id=doc["_id"])
+    assert item.direction_from_new_york == "SW"
+    assert item.latitude == 40.7128
+
+COMPACT_MODE_SCRIPT = textwrap.dedent("""
+    import json, mongomock
+    from mongoengine import connect, disconnect
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.models import Item, compact_document
+    from app.tools.backfill import backfill_directions
+    from app.tools.compact import rewrite_item_storage
+
+    disconnect()
+    connect("mongoenginetest", mongo_client_class=mongomock.MongoClient)
+    client = TestClient(app)
+    client.headers.update({"Authorization": "Bearer test_token"})
+
+    item_id = client.post("/items", json={
+        "name": "Alice", "postcode": "10001", "latitude": 10.0, "longitude": 0.0,
+        "users": ["Alice"], "title": "Boss", "startDate": "2100-01-01T00:00:00+00:00",
+    }).json()["_id"]
+
+    # Partial update of a loaded document, including the packed coordinates
+    item = Item.objects.get(id=item_id)
+    item.update(set__name="Alicia", set__name_folded="alicia")
+    item.latitude = 50.0
+    item.save(validate=False)
+
+    collection = Item._get_collection()
+    raw = collection.find_one()
+    collection.update_one({"_id": raw["_id"]}, {"$set": {"d": 2}})  # Stale direction
+    backfill = backfill_directions()
+
+    long_doc = {"name": "Bob", "postcode": "10001", "latitude": 30.0, "longitude": -120.0, "users": ["Bob"]}
+    collection.insert_one(long_doc)
+    migration = rewrite_item_storage(compact=True)
+
+    print(json.dumps({
+        "raw_keys": sorted(collection.find_one({"_id": raw["_id"]}).keys()),
+        "item": client.get(f"/items/{item_id}").json(),
+        "search": [i["name"] for i in client.get("/items/search", params={"q": "ali", "mode": "prefix"}).json()["items"]],
+        "backfill_updated": backfill["updated"],
+        "migrated": migration["rewritten"],
+        "migrated_doc": sorted(collection.find_one({"_id": long_doc["_id"]}).keys()),
+    }))
+""")
+
+def run_in_compact_mode(script):
+    """
+    Runs `script` in a fresh interpreter with ITEM_COMPACT_STORAGE=1 and returns its last printed JSON line.
+    """
+    env = {**os.environ, "ITEM_COMPACT_STORAGE": "1"}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, cwd=root, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_compact_mode_keeps_public_shape():
+    output = run_in_compact_mode(COMPACT_MODE_SCRIPT)
+
+    assert output["raw_keys"] == ["_id", "d", "loc", "n", "nf", "p", "s", "t", "u"]
+    assert list(output["item"].keys()) == PUBLIC_KEYS
+    assert output["item"]["name"] == "Alicia"
+    assert output["item"]["direction_from_new_york"] == "NE"
+    assert output["item"]["latitude"] == 50.0
+    assert output["search"] == ["Alicia"]
+    assert output["backfill_updated"] == 1
+    assert output["migrated"] == 1
+    assert output["migrated_doc"] == ["_id", "loc", "n", "p", "u"]
+
+COMPACT_FILTERS_SCRIPT = textwrap.dedent("""
+    import json, mongomock
+    from mongoengine import connect, disconnect, Q
+    from mongoengine.errors import InvalidQueryError
+    from app.models import Item
+
+    disconnect()
+    connect("mongoenginetest", mongo_client_class=mongomock.MongoClient)
+    Item(name="Alice", postcode="10001", latitude=50.0, longitude=0.0, users=["Alice"], direction_from_new_york="NE").save()
+    Item(name="Bob", postcode="10001", latitude=30.0, longitude=-120.0, users=["Bob"], direction_from_new_york="SW").save()
+
+    counts = {
+        "direction": Item.objects(direction_from_new_york="NE").count(),
+        "direction_in": Item.objects(direction_from_new_york__in=["NE", "SW"]).count(),
+        "direction_ne": Item.objects(direction_from_new_york__ne="NE").count(),
+        "latitude": Item.objects(latitude=50.0).count(),
+        "longitude": Item.objects(longitude=-120.0).count(),
+        "latitude_gte": Item.objects(latitude__gte=40).count(),
+        "range": Item.objects(latitude__gte=20, latitude__lt=40, longitude__lt=0).count(),
+        "chained": Item.objects(name="Bob").filter(latitude=30.0).count(),
+        "q_or": Item.objects(Q(latitude=50.0) | Q(longitude=-120.0)).count(),
+        "only": [item.latitude for item in Item.objects.only("latitude").order_by("name")],
+        "exclude": [(item.name, item.latitude) for item in Item.objects.exclude("latitude").order_by("name")],
+        "scalar": list(Item.objects.order_by("name").scalar("latitude")),
+        "values_list": list(Item.objects.order_by("name").values_list("name", "longitude")),
+        "order_by_latitude": list(Item.objects.order_by("latitude").scalar("name")),
+        "order_by_longitude": list(Item.objects.order_by("-longitude").scalar("name")),
+    }
+
+    Item.objects(name="Bob").update(set__direction_from_new_york="SE")
+    counts["updated_direction"] = Item.objects(direction_from_new_york="SE").count()
+    counts["stored_code"] = Item._get_collection().find_one({"n": "Bob"})["d"]
+
+    rejected = []
+    try:
+        Item.objects(latitude__exists=True).count()
+    except InvalidQueryError:
+        rejected.append("filter")
+    try:
+        Item.objects.distinct("latitude")
+    except InvalidQueryError:
+        rejected.append("distinct")
+    try:
+        Item.objects(name="Bob").update(set__latitude=1.0)
+    except InvalidQueryError:
+        rejected.append("update")
+    counts["rejected"] = rejected
+
+    print(json.dumps(counts))
+""")
+
+def test_compact_mode_filters():
+    counts = run_in_compact_mode(COMPACT_FILTERS_SCRIPT)
+
+    assert counts == {
+        "direction": 1,
+        "direction_in": 2,
+        "direction_ne": 1,
+        "latitude": 1,
+        "longitude": 1,
+        "latitude_gte": 1,
+        "range": 1,
+        "chained": 1,
+        "q_or": 2,
+        "only": [50.0, 30.0],
+        "exclude": [["Alice", None], ["Bob", None]],
+        "scalar": [50.0, 30.0],
+        "values_list": [["Alice", 0.0], ["Bob", -120.0]],
+        "order_by_latitude": ["Bob", "Alice"],
+        "order_by_longitude": ["Alice", "Bob"],
+        "updated_direction": 1,
+        "stored_code": 2,
+        "rejected": ["filter", "distinct", "update"],
+    }
@@ -0,0 +1,170 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.events import TrackedAsyncIOEventEmitter, event_emitter
+from app.lifecycle import graceful_shutdown
+from tests.utils.utils import getFutureDate
+
+def recording_handler(emitter, **options):
+    """
+    Registers a batch handler on `emitter` for "test_event" that records the batches it receives.
+    """
+    batches = []
+
+    @emitter.on_batch("test_event", **options)
+    async def record(events):
+        batches.append(events)
+
+    return batches
+
+def handler_stats(emitter):
+    """
+    Returns the stats of the only batch handler registered on `emitter`.
+    """
+    [stats] = emitter.batch_stats().values()
+    return stats
+
+def test_batches_are_coalesced_by_size():
+    emitter = TrackedAsyncIOEventEmitter()
+    batches = recording_handler(emitter, max_batch_size=10, max_wait_seconds=60)
+
+    async def emit_events():
+        for i in range(25):
+            emitter.emit("test_event", i)
+        await asyncio.wait(set(emitter.pending))
+
+    asyncio.run(emit_events())
+
+    assert batches == [list(range(10)), list(range(10, 20))]
+    assert handler_stats(emitter)["buffered_events"] == 5
+
+def test_batches_are_flushed_after_max_wait():
+    emitter = TrackedAsyncIOEventEmitter()
+    batches = recording_handler(emitter, max_batch_size=100, max_wait_seconds=0.01)
+
+    async def emit_events():
+        emitter.emit("test_event", 1)
+        emitter.emit("test_event", 2)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(emit_events())
+
+    assert batches == [[1, 2]]
+
+def test_failed_batches_are_retried_with_backoff():
+    emitter = TrackedAsyncIOEventEmitter()
+    attempts = []
+
+    @emitter.on_batch("test_event", max_batch_size=2, max_retries=3, backoff_seconds=0.01)
+    async def flaky(events):
+        attempts.append(asyncio.get_running_loop().time())
+        if len(attempts) < 3:
+            raise ConnectionError("downstream unavailable")
+
+    async def emit_events():
+        emitter.emit("test_event", 1)
+        emitter.emit("test_event", 2)
+        await asyncio.wait(set(emitter.pending))
+
+    asyncio.run(emit_events())
+
+    stats = handler_stats(emitter)
+    assert len(attempts) == 3
+    assert attempts[1] - attempts[0] >= 0.01
+    assert attempts[2] - attempts[1] >= 0.02
+    assert stats["retries"] == 2
+    assert stats["delivered_events"] == 2
+    assert stats["failed_events"] == 0
+
+def test_batches_are_dropped_after_max_retries():
+    emitter = TrackedAsyncIOEventEmitter()
+
+    @emitter.on_batch("test_event", max_batch_size=1, max_retries=1, backoff_seconds=0)
+    async def failing(events):
+        raise ConnectionError("downstream unavailable")
+
+    async def emit_events():
+        emitter.emit("test_event", 1)
+        await asyncio.wait(set(emitter.pending))
+
+    asyncio.run(emit_events())
+
+    stats = handler_stats(emitter)
+    assert stats["retries"] == 1
+    assert stats["failed_events"] == 1
+    assert stats["delivered_events"] == 0
+
+def test_concurrency_limit():
+    emitter = TrackedAsyncIOEventEmitter()
+
+    @emitter.on_batch("test_event", max_batch_size=1, max_concurrency=2)
+    async def slow(events):
+        await asyncio.sleep(0.01)
+
+    async def emit_events():
+        for i in range(10):
+            emitter.emit("test_event", i)
+        await asyncio.wait(set(emitter.pending))
+
+    asyncio.run(emit_events())
+
+    stats = handler_stats(emitter)
+    assert stats["batches"] == 10
+    assert stats["peak_in_flight"] == 2
+    assert stats["max_concurrency"] == 2
+
+def test_handlers_with_the_same_name_are_kept_apart():
+    emitter = TrackedAsyncIOEventEmitter()
+    recording_handler(emitter)
+
+    @emitter.on_batch("test_event")
+    async def record(events):
+        pass
+
+    assert len(emitter.batch_stats()) == 2
+    with pytest.raises(ValueError, match="already registered"):
+        recording_handler(emitter)
+
+def test_shutdown_flushes_buffered_batches():
+    batches = []
+
+    @event_emitter.on_batch("test_event", max_batch_size=100, max_wait_seconds=60)
+    async def record(events):
+        batches.append(events)
+
+    async def emit_and_shut_down():
+        event_emitter.emit("test_event", 1)
+        return await graceful_shutdown(timeout=5)
+
+    try:
+        report = asyncio.run(emit_and_shut_down())
+    finally:
+        event_emitter.remove_batch_handler("test_event", record)
+
+    assert batches == [[1]]
+    assert report["unfinished_events"] == 0
+
+def test_created_items_are_delivered_in_batches(monkeypatch, caplog):
+    monkeypatch.setattr(event_emitter.batch_handlers[("item_created", "app.events.handle_items_created")], "max_wait_seconds", 60)
+
+    # Leaving the client shuts the app down, which delivers the buffered batch
+    with caplog.at_level("INFO"), TestClient(app) as client:
+        client.headers.update({"Authorization": "Bearer test_token"})
+        for i in range(3):
+            client.post("/items", json={
+                "name": f"Item{i}",
+                "postcode": "12345",
+                "latitude": 12.3456,
+                "longitude": -78.9012,
+                "users": [f"Item{i}"],
+                "startDate": getFutureDate(),
+            })
+
+    assert any("3 items created" in message for message in caplog.messages)
+
+def test_metrics_include_event_handlers(test_client):
+    response = test_client.get("/metrics")
+
+    assert 'app_event_handler_max_concurrency{event="item_created",handler="app.events.handle_items_created"}' in response.text
+    assert "# TYPE app_event_handler_delivered_events_total counter" in response.text
@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pytz import UTC
+from fastapi import Response
+from app.models import Item, IdempotencyRecord
+from app.routes import items
+from app.routes.items import create_item
+from app.utils import idempotency
+from tests.utils.utils import getFutureDate
+
+def item_data(name="Item1"):
+    return {
+        "name": name,
+        "postcode": "12345",
+        "latitude": 12.3456,
+        "longitude": -78.9012,
+        "users": [name],
+        "startDate": getFutureDate(),
+    }
+
+def test_retry_returns_stored_response(test_client):
+    data = item_data()
+    headers = {"Idempotency-Key": "retry-key"}
+
+    first = test_client.post("/items", json=data, headers=headers)
+    retry = test_client.post("/items", json=data, headers=headers)
+
+    assert first.status_code == 200
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert Item.objects.count() == 1
+
+def test_retry_after_cache_eviction_uses_database(test_client):
+    data = item_data()
+    headers = {"Idempotency-Key": "db-key"}
+
+    first = test_client.post("/items", json=data, headers=headers)
+    idempotency._cache.clear()
+    retry = test_client.post("/items", json=data, headers=headers)
+
+    assert retry.json() == first.json()
+    assert Item.objects.count() == 1
+
+def test_requests_without_key_are_not_deduplicated(test_client):
+    data = item_data()
+
+    test_client.post("/items", json=data)
+    test_client.post("/items", json=data)
+
+    assert Item.objects.count() == 2
+
+def test_key_reused_with_different_body(test_client):
+    headers = {"Idempotency-Key": "reused-key"}
+
+    test_client.post("/items", json=item_data("Item1"), headers=headers)
+    response = test_client.post("/items", json=item_data("Item2"), headers=headers)
+
+    assert response.status_code == 422
+    assert Item.objects.count() == 1
+
+def test_key_in_progress_elsewhere(test_client):
+    data = item_data()
+    IdempotencyRecord(key="busy-key", request_hash=idempotency.request_fingerprint(data)).save()
+
+    response = test_client.post("/items", json=data, headers={"Idempotency-Key": "busy-key"})
+
+    assert response.status_code == 409
+    assert Item.objects.count() == 0
+
+def test_failed_request_releases_key(test_client):
+    headers = {"Idempotency-Key": "failed-key"}
+    data = item_data()
+
+    invalid = test_client.post("/items", json={**data, "postcode": "invalid"}, headers=headers)
+    assert invalid.status_code == 400
+    assert IdempotencyRecord.objects.count() == 0
+
+    valid = test_client.post("/items", json=data, headers=headers)
+    assert valid.status_code == 200
+
+def test_abandoned_reservation_is_reclaimed(test_client):
+    data = item_data()
+    reserved_at = datetime.now(UTC) - timedelta(seconds=idempotency.IDEMPOTENCY_LEASE_SECONDS + 1)
+    IdempotencyRecord(key="crashed-key", request_hash=idempotency.request_fingerprint(data), reserved_at=reserved_at).save()
+
+    response = test_client.post("/items", json=data, headers={"Idempotency-Key": "crashed-key"})
+    retry = test_client.post("/items", json=data, headers={"Idempotency-Key": "crashed-key"})
+
+    assert response.status_code == 200
+    assert retry.json() == response.json()
+    assert Item.objects.count() == 1
+
+@pytest.fixture(scope="function")
+def slow_save(monkeypatch):
+    """
+    Makes saving an item take a while, so concurrent requests overlap while it runs in the threadpool.
+    """
+    save_new_item = items.save_new_item
+
+    def slow(payload):
+        time.sleep(0.01)
+        return save_new_item(payload)
+
+    monkeypatch.setattr(items, "save_new_item", slow)
+
+def send_concurrently(data, count=5):
+    async def send():
+        return await asyncio.gather(
+            *(create_item(data, Response(), "concurrent-key") for _ in range(count)), return_exceptions=True,
+        )
+
+    return asyncio.run(send())
+
+def test_concurrent_requests_write_once(slow_save):
+    results = send_concurrently(item_data())
+
+    assert len({result["_id"] for result in results}) == 1
+    assert Item.objects.count() == 1
+
+def test_concurrent_requests_conflict_without_lock(slow_save, monkeypatch):
+    @asynccontextmanager
+    async def no_lock(key):
+        yield
+
+    monkeypatch.setattr(items, "idempotency_lock", no_lock)
+
+    results = send_concurrently(item_data())
+
+    # The other requests find the key reserved but not yet answered
+    assert [result.status_code for result in results if isinstance(result, Exception)] == [409] * 4
+    assert Item.objects.count() == 1
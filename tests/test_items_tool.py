@@ -0,0 +1,174 @@
+import json
+import pytest
+from datetime import datetime
+from app.models import Item
+from app.tools import items as items_tool
+from app.tools.items import export_items, import_items, read_rows
+from tests.utils.database import reset_test_db
+from tests.utils.utils import getFutureDate
+
+def make_row(name, **overrides):
+    row = {
+        "name": name,
+        "postcode": "12345",
+        "latitude": 12.3456,
+        "longitude": -78.9012,
+        "users": [name],
+        "startDate": getFutureDate(),
+    }
+    row.update(overrides)
+    return row
+
+def write_ndjson(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+def test_import_ndjson(tmp_path):
+    path = write_ndjson(tmp_path / "items.ndjson", [make_row(f"Item{i}") for i in range(5)])
+
+    report = import_items(path, batch_size=2, workers=2)
+
+    assert report["rows"] == 5
+    assert report["inserted"] == 5
+    assert Item.objects.count() == 5
+    item = Item.objects.get(name="Item0")
+    assert item.direction_from_new_york == "NW"
+    assert item.name_folded == "item0"
+
+def test_import_rejects_invalid_rows(tmp_path):
+    rows = [
+        make_row("Valid"),
+        make_row("BadPostcode", postcode="invalid"),
+        make_row("NotInUsers", users=["Someone"]),
+        make_row("BadLatitude", latitude=120),
+    ]
+    path = write_ndjson(tmp_path / "items.ndjson", rows)
+
+    report = import_items(path, batch_size=10, workers=1)
+
+    assert report["inserted"] == 1
+    assert report["rejected"] == 3
+    assert [item.name for item in Item.objects] == ["Valid"]
+
+def test_export_import_round_trip(tmp_path):
+    for fmt, filename in (("ndjson", "items.ndjson.gz"), ("csv", "items.csv.gz")):
+        reset_test_db()
+        path = write_ndjson(tmp_path / "seed.ndjson", [make_row("Alice", title="Boss"), make_row("Bob")])
+        import_items(path, workers=1)
+
+        export_path = str(tmp_path / filename)
+        assert export_items(export_path) == 2
+        exported = list(read_rows(export_path))
+        assert {row["name"] for row in exported} == {"Alice", "Bob"}, fmt
+
+        Item.drop_collection()
+        report = import_items(export_path, workers=1)
+
+        assert report["inserted"] == 2, fmt
+        alice = Item.objects.get(name="Alice")
+        assert alice.title == "Boss"
+        assert str(alice.id) in {row["_id"] for row in exported}
+
+def test_import_resumes_from_checkpoint(tmp_path):
+    path = write_ndjson(tmp_path / "items.ndjson", [make_row(f"Item{i}") for i in range(4)])
+    checkpoint = tmp_path / "import.ckpt"
+    checkpoint.write_text(json.dumps({"source": path, "rows": 3}))
+
+    report = import_items(path, workers=1, checkpoint=str(checkpoint))
+
+    assert report["rows"] == 1
+    assert [item.name for item in Item.objects] == ["Item3"]
+    assert json.loads(checkpoint.read_text())["rows"] == 4
+
+def test_resume_after_failed_batch_does_not_duplicate_rows(tmp_path, monkeypatch):
+    path = write_ndjson(tmp_path / "items.ndjson", [make_row(f"Item{i}") for i in range(6)])
+    checkpoint = tmp_path / "import.ckpt"
+    write_batch = items_tool._write_batch
+
+    def fail_first_batch(records, *args):
+        if records[0][0] == 1:
+            raise ConnectionError("connection reset")
+        return write_batch(records, *args)
+
+    # The later batches are written, but the checkpoint stays before the failed one
+    monkeypatch.setattr(items_tool, "_write_batch", fail_first_batch)
+    with pytest.raises(ConnectionError):
+        import_items(path, batch_size=2, workers=2, checkpoint=str(checkpoint))
+    assert Item.objects.count() == 4
+
+    monkeypatch.setattr(items_tool, "_write_batch", write_batch)
+    report = import_items(path, batch_size=2, workers=2, checkpoint=str(checkpoint))
+
+    assert report["inserted"] == 2
+    assert report["duplicates"] == 4
+    assert sorted(item.name for item in Item.objects) == [f"Item{i}" for i in range(6)]
+
+def test_reimport_skips_existing_ids(tmp_path):
+    path = write_ndjson(tmp_path / "seed.ndjson", [make_row("Alice")])
+    import_items(path, workers=1)
+    export_path = str(tmp_path / "items.ndjson")
+    export_items(export_path)
+
+    report = import_items(export_path, workers=1)
+
+    assert report["inserted"] == 0
+    assert report["duplicates"] == 1
+    assert Item.objects.count() == 1
+
+def test_import_rejects_unparseable_lines(tmp_path, caplog):
+    path = tmp_path / "items.ndjson"
+    path.write_text(json.dumps(make_row("First")) + "\n{not json\n" + json.dumps(make_row("Last")) + "\n")
+    checkpoint = tmp_path / "import.ckpt"
+
+    with caplog.at_level("WARNING"):
+        report = import_items(str(path), workers=1, checkpoint=str(checkpoint))
+
+    assert report["rows"] == 3
+    assert report["inserted"] == 2
+    assert report["rejected"] == 1
+    assert any("line 2" in message for message in caplog.messages)
+    # Resuming does not get stuck on the bad line
+    assert json.loads(checkpoint.read_text())["rows"] == 3
+
+def test_import_rejects_invalid_csv_users(tmp_path, caplog):
+    path = tmp_path / "items.csv"
+    path.write_text(
+        "name,postcode,latitude,longitude,users,start_date\n"
+        f'Alice,10001,10.0,0.0,"[""Alice""]",{getFutureDate()}\n'
+        f"Bob,10001,10.0,0.0,Bob,{getFutureDate()}\n"
+    )
+
+    with caplog.at_level("WARNING"):
+        report = import_items(str(path), workers=1)
+
+    assert report["inserted"] == 1
+    assert report["rejected"] == 1
+    assert any("line 3" in message and "users" in message for message in caplog.messages)
+
+def test_round_trip_keeps_past_and_missing_start_dates(tmp_path):
+    collection = Item._get_collection()
+    collection.insert_many([
+        {"name": "Past", "postcode": "10001", "latitude": 10.0, "longitude": 0.0, "users": ["Past"],
+         "start_date": datetime(2020, 1, 1)},
+        {"name": "Undated", "postcode": "10001", "latitude": 10.0, "longitude": 0.0, "users": ["Undated"]},
+    ])
+    export_path = str(tmp_path / "items.ndjson")
+    assert export_items(export_path) == 2
+
+    Item.drop_collection()
+    report = import_items(export_path, workers=1)
+
+    assert report["inserted"] == 2
+    assert report["rejected"] == 0
+    assert Item.objects.get(name="Past").start_date == datetime(2020, 1, 1)
+    assert Item.objects.get(name="Undated").start_date is None
+
+def test_new_rows_still_need_a_future_start_date(tmp_path, caplog):
+    path = write_ndjson(tmp_path / "items.ndjson", [make_row("Past", startDate="2020-01-01"), make_row("Undated", startDate=None)])
+
+    with caplog.at_level("WARNING"):
+        report = import_items(path, workers=1)
+
+    assert report["rejected"] == 2
+    assert any("at least 1 week" in message for message in caplog.messages)
+    assert any("Invalid 'startDate'" in message for message in caplog.messages)
@@ -0,0 +1,117 @@
+import threading
+import pytest
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware.request_trace import RequestTraceMiddleware
+from app.routes.items import router as items_router
+from app.utils import request_trace
+from app.utils.profiling import sample_stacks
+from app.utils.request_trace import MongoCommandListener, RequestTrace, current_trace
+from tests.utils.utils import getFutureDate
+
+@pytest.fixture(scope="function")
+def test_client(test_client, monkeypatch):
+    """
+    The session's test client, with profiling enabled.
+    """
+    monkeypatch.setattr(request_trace, "PROFILING_ENABLED", True)
+    return test_client
+
+def busy_wait_for_profiler(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sample_stacks_collapsed_format():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_wait_for_profiler, args=(stop,))
+    worker.start()
+    try:
+        collapsed = sample_stacks(0.1, interval=0.001)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = collapsed.splitlines()
+    assert any("busy_wait_for_profiler (test_profiling.py" in line for line in lines)
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        assert stack
+
+def test_profile_endpoint(test_client):
+    response = test_client.post("/admin/profile", params={"seconds": 0.05})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "profile.collapsed" in response.headers["content-disposition"]
+
+def test_profile_endpoint_invalid_duration(test_client):
+    response = test_client.post("/admin/profile", params={"seconds": 600})
+    assert response.status_code == 400
+
+def test_profiling_disabled_by_default(test_client, monkeypatch):
+    monkeypatch.setattr(request_trace, "PROFILING_ENABLED", False)
+    assert test_client.post("/admin/profile").status_code == 404
+    assert test_client.get("/admin/slow-requests").status_code == 404
+
+def test_slow_requests_record_phases(test_client):
+    traced_app = FastAPI()
+    traced_app.add_middleware(RequestTraceMiddleware, threshold_ms=0)
+    traced_app.include_router(items_router)
+    client = TestClient(traced_app)
+    client.headers.update({"Authorization": "Bearer test_token"})
+
+    client.post("/items", json={
+        "name": "Item1",
+        "postcode": "12345",
+        "latitude": 12.3456,
+        "longitude": -78.9012,
+        "users": ["Item1"],
+        "startDate": getFutureDate(),
+    })
+
+    recorded = test_client.get("/admin/slow-requests").json()["requests"]
+    assert len(recorded) == 1
+    assert recorded[0]["method"] == "POST"
+    assert recorded[0]["path"] == "/items"
+    assert recorded[0]["status_code"] == 200
+    assert set(recorded[0]["phases_ms"]) == {"validate", "direction", "db"}
+
+def test_fast_requests_are_not_recorded():
+    traced_app = FastAPI()
+    traced_app.add_middleware(RequestTraceMiddleware, threshold_ms=60_000)
+    traced_app.get("/")(lambda: {})
+
+    TestClient(traced_app).get("/")
+
+    assert len(request_trace.slow_requests) == 0
+
+def test_command_listener_records_commands_of_current_request():
+    listener = MongoCommandListener()
+    trace = RequestTrace("GET", "/items")
+    token = current_trace.set(trace)
+    try:
+        listener.started(SimpleNamespace(request_id=1, command_name="find", command={"find": "item", "filter": {}}))
+        listener.succeeded(SimpleNamespace(request_id=1, command_name="find", duration_micros=1500))
+    finally:
+        current_trace.reset(token)
+
+    # Outside a request nothing is recorded
+    listener.started(SimpleNamespace(request_id=2, command_name="find", command={"find": "item"}))
+
+    assert trace.commands == [{"command": "find", "collection": "item", "duration_ms": 1.5, "succeeded": True}]
+
+def test_command_listener_records_collection_names_only():
+    listener = MongoCommandListener()
+    trace = RequestTrace("GET", "/items")
+    token = current_trace.set(trace)
+    try:
+        listener.started(SimpleNamespace(request_id=1, command_name="getMore", command={"getMore": 12345, "collection": "item"}))
+        listener.succeeded(SimpleNamespace(request_id=1, command_name="getMore", duration_micros=100))
+        listener.started(SimpleNamespace(request_id=2, command_name="endSessions", command={"endSessions": [{"id": "session"}]}))
+        listener.succeeded(SimpleNamespace(request_id=2, command_name="endSessions", duration_micros=100))
+    finally:
+        current_trace.reset(token)
+
+    assert [command["collection"] for command in trace.commands] == ["item", None]
@@ -0,0 +1,93 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import get_read_preference
+from mongoengine import disconnect
+from mongoengine.queryset import QuerySet
+from pymongo.read_preferences import Primary, SecondaryPreferred, Nearest
+from unittest.mock import patch
+from tests.utils.database import connect_test_db, reset_test_db
+from tests.utils.utils import getFutureDate
+
+REPLICA_SET_URI = os.getenv("MONGO_REPLICA_SET_URI")
+
+@pytest.fixture(scope="function", autouse=True)
+def test_db(test_db):
+    """
+    Switches to the worker's database on the local replica set when
+    MONGO_REPLICA_SET_URI is set (see `make start_mongo_rs`).
+    It also resets the cached read preferences between tests.
+    """
+    get_read_preference.cache_clear()
+    if REPLICA_SET_URI:
+        disconnect()
+        connect_test_db(host=REPLICA_SET_URI)
+        reset_test_db()
+
+    yield
+
+    get_read_preference.cache_clear()
+    if REPLICA_SET_URI:
+        disconnect()
+
+def test_default_read_preferences():
+    assert get_read_preference("list") == SecondaryPreferred()
+    assert get_read_preference("item") == Primary()
+
+def test_read_preferences_from_environment(monkeypatch):
+    monkeypatch.setenv("MONGO_READ_PREFERENCE_LIST", "nearest")
+    monkeypatch.setenv("MONGO_MAX_STALENESS_SECONDS", "120")
+
+    assert get_read_preference("list") == Nearest(max_staleness=120)
+
+def test_invalid_read_preference(monkeypatch):
+    monkeypatch.setenv("MONGO_READ_PREFERENCE_LIST", "anywhere")
+
+    with pytest.raises(ValueError):
+        get_read_preference("list")
+
+def test_max_staleness_below_minimum(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_STALENESS_SECONDS", "30")
+
+    with pytest.raises(ValueError):
+        get_read_preference("list")
+
+def test_non_integer_max_staleness(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_STALENESS_SECONDS", "two minutes")
+
+    with pytest.raises(ValueError, match="integer"):
+        get_read_preference("list")
+
+def test_invalid_read_preference_fails_startup(monkeypatch):
+    monkeypatch.setenv("MONGO_READ_PREFERENCE_LIST", "anywhere")
+
+    with pytest.raises(ValueError, match="anywhere"):
+        with TestClient(app):
+            pass
+
+def test_routes_use_their_read_preference(test_client):
+    used = []
+    original = QuerySet.read_preference
+
+    def record(queryset, read_preference):
+        used.append(read_preference)
+        return original(queryset, read_preference)
+
+    item_data = {
+        "name": "Item1",
+        "postcode": "12345",
+        "latitude": 12.3456,
+        "longitude": -78.9012,
+        "users": ["Item1"],
+        "startDate": getFutureDate(),
+    }
+    with patch.object(QuerySet, "read_preference", autospec=True, side_effect=record):
+        item_id = test_client.post("/items", json=item_data).json()["_id"]
+
+        # Read-your-writes: the item is visible right after the write
+        assert test_client.get(f"/items/{item_id}").status_code == 200
+        assert test_client.get("/items").status_code == 200
+        assert test_client.get("/items/search", params={"q": "item", "mode": "prefix"}).status_code == 200
+
+    assert used == [Primary(), SecondaryPreferred(), SecondaryPreferred()]
@@ -0,0 +1,70 @@
+from app.models import Item
+from unittest.mock import patch, MagicMock
+
+def create_items(*names):
+    for name in names:
+        Item(name=name, postcode="10001", latitude=40.7128, longitude=-74.0060, users=[name]).save()
+
+def test_name_folded_is_maintained_on_save():
+    item = Item(name="MiXeD", postcode="10001", latitude=40.7128, longitude=-74.0060, users=["MiXeD"]).save()
+    assert item.name_folded == "mixed"
+
+    item.name = "Renamed"
+    item.save()
+    assert Item.objects.get(id=item.id).name_folded == "renamed"
+
+def test_search_prefix_is_case_insensitive(test_client):
+    create_items("Apple", "apricot", "Banana")
+
+    response = test_client.get("/items/search", params={"q": "AP", "mode": "prefix"})
+    assert response.status_code == 200
+
+    names = [item["name"] for item in response.json()["items"]]
+    assert names == ["Apple", "apricot"]
+
+def test_search_prefix_pagination(test_client):
+    create_items("Item1", "Item2", "Item3")
+
+    response = test_client.get("/items/search", params={"q": "item", "mode": "prefix", "page": 2, "page_size": 2})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["page"] == 2
+    assert data["page_size"] == 2
+    assert [item["name"] for item in data["items"]] == ["Item3"]
+
+def test_search_does_not_expose_internal_fields(test_client):
+    create_items("Apple")
+
+    response = test_client.get("/items/search", params={"q": "app", "mode": "prefix"})
+    assert response.status_code == 200
+    assert "name_folded" not in response.json()["items"][0]
+
+def test_search_text_mode_ranks_by_relevance(test_client):
+    """
+    mongomock does not implement $text, so only check the query that is built.
+    """
+    objects = MagicMock()
+    queryset = objects.read_preference.return_value
+    queryset.search_text.return_value.order_by.return_value.skip.return_value.limit.return_value = []
+
+    with patch.object(Item, "objects", objects):
+        response = test_client.get("/items/search", params={"q": "apple"})
+
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+    queryset.search_text.assert_called_once_with("apple")
+    queryset.search_text.return_value.order_by.assert_called_once_with("$text_score")
+
+def test_search_missing_query(test_client):
+    response = test_client.get("/items/search")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Missing search query 'q'."
+
+def test_search_invalid_mode(test_client):
+    response = test_client.get("/items/search", params={"q": "apple", "mode": "fuzzy"})
+    assert response.status_code == 400
+
+def test_search_invalid_page_size(test_client):
+    response = test_client.get("/items/search", params={"q": "apple", "page_size": 1000})
+    assert response.status_code == 400
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import signal
+import subprocess
+import time
+import sys
+import textwrap
+import pytest
+from app import database
+from app.events import event_emitter
+from app.lifecycle import graceful_shutdown
+from app.main import app
+from app.middleware.shutdown import request_tracker
+from app.routes.admin import backfill_stop
+from app.server import GracefulServer
+from uvicorn import Config
+from mongoengine.connection import get_connection, ConnectionFailure
+
+@pytest.fixture(scope="function")
+def slow_handler():
+    """
+    Registers a handler for a test event that takes `delay` seconds.
+    """
+    finished = []
+
+    async def handler(delay):
+        await asyncio.sleep(delay)
+        finished.append(delay)
+
+    event_emitter.on("slow_test_event", handler)
+    yield finished
+    event_emitter.remove_listener("slow_test_event", handler)
+
+def test_draining_server_rejects_requests(test_client):
+    request_tracker.draining = True
+
+    response = test_client.get("/")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_requests_accepted_after_restart(test_client):
+    assert test_client.get("/").status_code == 200
+
+def test_shutdown_waits_for_pending_events(slow_handler):
+    async def emit_and_shut_down():
+        event_emitter.emit("slow_test_event", 0.05)
+        return await graceful_shutdown(timeout=5)
+
+    report = asyncio.run(emit_and_shut_down())
+
+    assert slow_handler == [0.05]
+    assert report["unfinished_events"] == 0
+    assert set(report["phases"]) == {"stop_accepting", "drain_requests", "drain_events", "flush_logs", "close_database"}
+
+def test_shutdown_respects_deadline(slow_handler):
+    async def emit_and_shut_down():
+        event_emitter.emit("slow_test_event", 10)
+        return await graceful_shutdown(timeout=0.05)
+
+    report = asyncio.run(emit_and_shut_down())
+
+    assert slow_handler == []
+    assert report["unfinished_events"] == 1
+    assert report["phases"]["drain_events"] < 1
+
+def test_exit_signal_stops_accepting_before_server_exits(test_client):
+    server = GracefulServer(Config(app))
+
+    try:
+        server.handle_exit(signal.SIGTERM, None)
+
+        # uvicorn is still serving at this point; the requests it receives are refused
+        assert server.should_exit
+        assert backfill_stop.is_set()
+        assert test_client.get("/").status_code == 503
+    finally:
+        backfill_stop.clear()
+
+def test_shutdown_deadline_counts_from_exit_signal(slow_handler):
+    async def emit_and_shut_down():
+        event_emitter.emit("slow_test_event", 10)
+        return await graceful_shutdown(timeout=5)
+
+    # uvicorn spent the whole budget draining requests after the signal
+    request_tracker.start_draining()
+    request_tracker.draining_since = time.monotonic() - 5
+    report = asyncio.run(emit_and_shut_down())
+
+    assert report["unfinished_events"] == 1
+    assert report["phases"]["drain_events"] < 1
+
+def test_shutdown_closes_database():
+    asyncio.run(graceful_shutdown(timeout=0))
+
+    with pytest.raises(ConnectionFailure):
+        get_connection()
+
+def test_startup_reuses_registered_connection(test_client):
+    # The session's app started on the mongomock connection without opening a client of its own
+    assert database._client is None
+    assert test_client.get("/").status_code == 200
+
+NO_NETWORK_SCRIPT = textwrap.dedent("""
+    import socket
+
+    def refuse(*args, **kwargs):
+        raise AssertionError(f"network access to {args[1:]}")
+
+    socket.socket.connect = refuse
+    import app.main
+    print("imported")
+""")
+
+def test_app_import_does_not_touch_network():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", NO_NETWORK_SCRIPT], cwd=root, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "imported"
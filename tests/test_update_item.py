@@ -1,39 +1,6 @@
-import pytest
-from fastapi.testclient import TestClient
-from app.main import app
-from mongoengine import connect, disconnect
-import mongomock
 from tests.utils.utils import getFutureDate
 from bson import ObjectId
 
-@pytest.fixture(scope="function", autouse=True)
-def test_db():
-    """
-    This fixture sets up an in-memory MongoDB using mongomock.
-    It ensures each test runs with a clean database.
-    """
-    disconnect() 
-
-    connect(
-        "mongoenginetest",
-        host="mongodb://localhost", 
-        mongo_client_class=mongomock.MongoClient,  
-    )
-
-    yield 
-
-    disconnect()  
-
-@pytest.fixture(scope="function")
-def test_client():
-    """
-    Creates a test client for FastAPI.
-    Ensures the test database is used.
-    """
-    with TestClient(app) as client:
-        client.headers.update({"Authorization": "Bearer test_token"})
-        yield client
-
 def test_update_existing_item(test_client):
     item_data = {
         "name": "OldItem",
@@ -0,0 +1,165 @@
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from types import SimpleNamespace
+from unittest.mock import patch
+import mongomock
+from pymongo import monitoring, InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from app.utils.request_trace import command_metrics
+
+# mongomock method -> command a real server would receive (bulk_write is split, see below)
+MONGOMOCK_COMMANDS = {
+    "find": "find",
+    "find_one": "find",
+    "insert_one": "insert",
+    "insert_many": "insert",
+    "update_one": "update",
+    "update_many": "update",
+    "replace_one": "update",
+    "delete_one": "delete",
+    "delete_many": "delete",
+    "count_documents": "aggregate",
+    "estimated_document_count": "count",
+    "aggregate": "aggregate",
+    "distinct": "distinct",
+    "find_one_and_update": "findAndModify",
+    "find_one_and_replace": "findAndModify",
+    "find_one_and_delete": "findAndModify",
+    "create_index": "createIndexes",
+    "create_indexes": "createIndexes",
+}
+
+# bulk_write operation -> the write command pymongo sends it in
+BULK_WRITE_COMMANDS = {
+    InsertOne: "insert",
+    UpdateOne: "update",
+    UpdateMany: "update",
+    ReplaceOne: "update",
+    DeleteOne: "delete",
+    DeleteMany: "delete",
+}
+
+# Documents in the first batch of a find without a batch size; the rest comes in one getMore
+FIRST_BATCH_SIZE = 101
+
+_request_ids = itertools.count(1)
+# mongomock methods call each other (find_one -> find); only the outermost call is a command
+_in_command = ContextVar("in_command", default=False)
+
+def _bulk_write_commands(requests, ordered=True, **kwargs):
+    """
+    pymongo sends a bulk write as one insert/update/delete command per run of operations
+    of the same kind, or per kind when the write is unordered.
+    """
+    kinds = [BULK_WRITE_COMMANDS[type(request)] for request in requests]
+    if not ordered:
+        return [kind for kind in ("insert", "update", "delete") if kind in kinds]
+    return [kind for kind, _ in itertools.groupby(kinds)]
+
+@contextmanager
+def _published(command_names, collection_name):
+    """
+    Publishes started/succeeded events for `command_names` around the block.
+    """
+    listeners = monitoring._LISTENERS.command_listeners
+    request_ids = [next(_request_ids) for _ in command_names]
+    for request_id, command_name in zip(request_ids, command_names):
+        for listener in listeners:
+            listener.started(SimpleNamespace(
+                request_id=request_id, command_name=command_name, command={command_name: collection_name},
+            ))
+
+    token = _in_command.set(True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _in_command.reset(token)
+        duration_micros = int((time.perf_counter() - started) * 1_000_000 / max(len(command_names), 1))
+        for request_id, command_name in zip(request_ids, command_names):
+            for listener in listeners:
+                listener.succeeded(SimpleNamespace(
+                    request_id=request_id, command_name=command_name, duration_micros=duration_micros,
+                ))
+
+def _publishing(method, command_names):
+    """
+    Wraps a mongomock collection method so it publishes `command_names(*args, **kwargs)`.
+    """
+    @wraps(method)
+    def wrapper(collection, *args, **kwargs):
+        if _in_command.get():
+            return method(collection, *args, **kwargs)
+        with _published(command_names(*args, **kwargs), collection.name):
+            return method(collection, *args, **kwargs)
+
+    return wrapper
+
+def _find_with_batch_size(find):
+    # mongomock ignores the batch size, which decides when getMore is sent
+    @wraps(find)
+    def wrapper(collection, *args, batch_size=0, **kwargs):
+        cursor = find(collection, *args, **kwargs)
+        cursor._command_batch_size = batch_size
+        return cursor
+
+    return wrapper
+
+def _cursor_batch_size(cursor, count):
+    cursor._command_batch_size = count
+    return cursor
+
+def _cursor_next(next_):
+    """
+    Wraps `Cursor.__next__` so it publishes a getMore whenever a real cursor would have
+    run out of its current batch with documents left on the server.
+    """
+    @wraps(next_)
+    def wrapper(cursor):
+        emitted = cursor._emitted
+        batch_size = getattr(cursor, "_command_batch_size", 0)
+        at_batch_end = emitted % batch_size == 0 if batch_size else emitted == FIRST_BATCH_SIZE
+        if _in_command.get() or not emitted or not at_batch_end \
+                or emitted >= len(cursor._compute_results(with_limit_and_skip=True)):
+            return next_(cursor)
+        with _published(["getMore"], cursor.collection.name):
+            return next_(cursor)
+
+    return wrapper
+
+@contextmanager
+def mongomock_command_events():
+    """
+    Makes mongomock publish pymongo command events, one per command a real server would run
+    (including the getMore of cursors that outlive their first batch), so the app's command
+    listener sees the same traffic as in production.
+    """
+    collection = mongomock.collection.Collection
+    methods = {
+        name: _publishing(getattr(collection, name), lambda *args, command=command, **kwargs: [command])
+        for name, command in MONGOMOCK_COMMANDS.items()
+    }
+    methods["find"] = _publishing(_find_with_batch_size(collection.find), lambda *args, **kwargs: ["find"])
+    methods["bulk_write"] = _publishing(collection.bulk_write, _bulk_write_commands)
+    cursor_next = _cursor_next(mongomock.collection.Cursor.__next__)
+
+    with patch.multiple(collection, **methods), patch.multiple(
+        mongomock.collection.Cursor, __next__=cursor_next, next=cursor_next, batch_size=_cursor_batch_size,
+    ):
+        yield
+
+@contextmanager
+def command_budget(route, **expected):
+    """
+    Asserts the Mongo commands issued by requests to `route` (the endpoint name) within the block,
+    e.g. `with command_budget("get_item_by_id", find=1): client.get(...)`.
+    """
+    before = command_metrics.command_counts(route)
+    yield
+    after = command_metrics.command_counts(route)
+
+    issued = {command: count - before.get(command, 0) for command, count in after.items()}
+    issued = {command: count for command, count in issued.items() if count}
+    assert issued == expected, f"{route} issued {issued}, budget is {expected}"
@@ -0,0 +1,32 @@
+import os
+from mongoengine import connect
+from mongoengine.connection import get_db, ConnectionFailure
+import mongomock
+
+# Each pytest-xdist worker gets its own database ("master" without xdist)
+TEST_DB_NAME = f"mongoenginetest_{os.getenv('PYTEST_XDIST_WORKER', 'master')}"
+
+def connect_test_db(host=None):
+    """
+    Registers the default connection: the in-memory mongomock database, or the
+    worker's database on the MongoDB at `host`.
+    """
+    if host:
+        connect(TEST_DB_NAME, host=host)
+    else:
+        connect(TEST_DB_NAME, host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+
+def reset_test_db():
+    """
+    Empties every collection of the test database, connecting first if a test closed
+    the connection. Collections and their indexes are kept, which is much cheaper
+    than reconnecting and recreating them for every test.
+    """
+    try:
+        db = get_db()
+    except ConnectionFailure:
+        connect_test_db()
+        db = get_db()
+
+    for name in db.list_collection_names():
+        db[name].delete_many({})